@@ -1,33 +1,34 @@
 import os
 import json
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify, session
+import csv
+import tempfile
+import hashlib
+import gzip
+import copy
+import functools
+import itertools
+import io
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify, session, g, abort, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import or_, func, and_, not_
-import pandas as pd
+from werkzeug.utils import safe_join
+from sqlalchemy import or_, func, and_, not_, update, insert, bindparam, case, tuple_, inspect as sa_inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, date, timedelta, time, timezone
 from io import BytesIO
-from PIL import Image
-from fpdf import FPDF
-import matplotlib
-matplotlib.use('Agg') # <-- WICHTIG: Diese Zeile muss VOR dem Import von pyplot stehen
-import matplotlib.pyplot as plt
+from collections import OrderedDict
 import re
-
-
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from PyPDF2 import PdfReader
-import io
-from reportlab.platypus import Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.enums import TA_LEFT
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase.pdfdoc import PDFName, PDFString, PDFArray, PDFDictionary
-from PIL import Image # Wichtig: Fügen Sie diesen Import hinzu
+import bisect
+from time import perf_counter
+import sqlite3
+import threading
+import uuid
+import traceback
+import shutil
+import zipfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+# pandas, numpy, matplotlib, fpdf, reportlab und PyPDF2 werden erst in den Funktionen importiert,
+# die sie benötigen. So startet die App ohne die Ladezeit dieser Bibliotheken.
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -54,6 +55,9 @@ class TimeEntry(db.Model):
     category = db.Column(db.String(50), nullable=False)
     project = db.Column(db.String(100), nullable=False)
     info_text = db.Column(db.String(300), nullable=True)
+    # Deckt die Sortierung und die Keyset-Paginierung der Dokumentationsseite ab. AUTOINCREMENT, damit IDs
+    # gelöschter Einträge nie erneut vergeben werden (Voraussetzung für time_entry_fingerprint()).
+    __table_args__ = (db.Index('ix_time_entry_date_start_id', 'date', 'start_time', 'id'), {'sqlite_autoincrement': True})
 
     @property
     def duration(self):
@@ -74,6 +78,7 @@ class QuestionAnswer(db.Model):
     __bind_key__ = 'fragen'
     __tablename__ = 'question_answer'
     id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     category = db.Column(db.String(50), nullable=False)
     category_index = db.Column(db.Integer, nullable=False, default=1)
     question = db.Column(db.String(500), nullable=False)
@@ -81,17 +86,819 @@ class QuestionAnswer(db.Model):
     answer = db.Column(db.String(100), nullable=True)
     sort_index = db.Column(db.Integer, default=99)
     sasil_abgang_index = db.Column(db.Integer, nullable=True)
-    __table_args__ = (db.UniqueConstraint('category', 'category_index', 'question', 'sasil_abgang_index', name='_category_question_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'category', 'category_index', 'question', 'sasil_abgang_index', name='_category_question_uc'),
+        # Entspricht der Sortierung in fragen() und export_questions_pdf()
+        db.Index('ix_question_answer_project_order', 'project_id', 'category', 'category_index', 'sasil_abgang_index', 'sort_index'),
+    )
 
 class ComponentName(db.Model):
     __bind_key__ = 'fragen'
     __tablename__ = 'component_name'
     id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     category = db.Column(db.String(50), nullable=False)
     category_index = db.Column(db.Integer, nullable=False)
     name = db.Column(db.String(100), nullable=True)
-    __table_args__ = (db.UniqueConstraint('category', 'category_index', name='_category_index_uc'),)
+    __table_args__ = (db.UniqueConstraint('project_id', 'category', 'category_index', name='_category_index_uc'),)
+
+class Project(db.Model):
+    __bind_key__ = 'fragen'
+    __tablename__ = 'project'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=True)
+    config = db.Column(db.JSON, nullable=False, default=dict)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class Job(db.Model):
+    """Hintergrundauftrag (PDF-Erzeugung bzw. -Import); das Ergebnis liegt als Datei in JOBS_DIR."""
+    __bind_key__ = 'fragen'
+    __tablename__ = 'job'
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=True, index=True)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued, running, finished, failed
+    messages = db.Column(db.JSON, nullable=False, default=list) # [(Kategorie, Text)] wie bei flash()
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class FilterReport(db.Model):
+    """Gespeichertes Filter-Protokoll (siehe FilterTrace) einer Lösungsfilterung, abrufbar als HTML oder JSON."""
+    __bind_key__ = 'fragen'
+    __tablename__ = 'filter_report'
+    id = db.Column(db.String(32), primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey('job.id'), nullable=True, index=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=True, index=True)
+    label = db.Column(db.String(200), nullable=False)
+    data = db.Column(db.JSON, nullable=False) # {'components': [...]}
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
+# --- Schema-Pflege ---
+def create_missing_indexes():
+    """Legt in bestehenden Datenbanken die Indizes an, die db.create_all() nur für neue Tabellen erzeugt."""
+    for bind_key, metadata in db.metadatas.items():
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engines[bind_key], checkfirst=True)
+
+def upgrade_time_entry_autoincrement():
+    """Baut eine bestehende Tabelle time_entry ohne AUTOINCREMENT neu auf; IDs und Inhalte bleiben erhalten. Mehrfach ausführbar."""
+    table = TimeEntry.__table__
+    with db.engine.begin() as conn:
+        table_sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'time_entry'").scalar()
+        if table_sql is None or 'AUTOINCREMENT' in table_sql.upper(): return
+        legacy_indexes = [name for (name,) in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'time_entry' AND sql IS NOT NULL")]
+        conn.exec_driver_sql('ALTER TABLE time_entry RENAME TO time_entry_legacy')
+        for name in legacy_indexes:
+            conn.exec_driver_sql(f'DROP INDEX {name}')
+        table.create(conn)
+        columns = ', '.join(c.name for c in table.columns)
+        conn.exec_driver_sql(f'INSERT INTO time_entry ({columns}) SELECT {columns} FROM time_entry_legacy')
+        conn.exec_driver_sql('DROP TABLE time_entry_legacy')
+
+# --- Zeiterfassung: Aggregation in SQL ---
+# Dauer in Sekunden wie TimeEntry.duration: liegt das Ende vor dem Beginn, endet der Eintrag am Folgetag.
+_raw_duration_seconds = func.strftime('%s', TimeEntry.end_time) - func.strftime('%s', TimeEntry.start_time)
+entry_duration_seconds = case((TimeEntry.end_time < TimeEntry.start_time, _raw_duration_seconds + 86400), else_=_raw_duration_seconds)
+
+TIME_TOTAL_GROUPS = {'category': TimeEntry.category, 'project': TimeEntry.project, 'day': TimeEntry.date}
+
+def filter_time_entries(query, date_from=None, date_to=None, category=None, project=None):
+    if date_from: query = query.filter(TimeEntry.date >= date_from)
+    if date_to: query = query.filter(TimeEntry.date <= date_to)
+    if category: query = query.filter(TimeEntry.category == category)
+    if project: query = query.filter(TimeEntry.project == project)
+    return query
+
+def time_totals(group_by, **filters):
+    """Liefert [(Schlüssel, Stunden)] je Kategorie, Projekt oder Tag, summiert direkt in der Datenbank."""
+    key = TIME_TOTAL_GROUPS[group_by]
+    query = db.session.query(key, func.total(entry_duration_seconds) / 3600.0).group_by(key).order_by(key)
+    return [(group, hours) for group, hours in filter_time_entries(query, **filters)]
+
+def wants_json_response():
+    return request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json'
+
+def parse_date_arg(name):
+    value = request.args.get(name, '').strip()
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def time_entry_filters_from_args():
+    """Liest die Filter von, bis, kategorie und projekt aus der URL (ValueError bei ungültigem Datum)."""
+    return {
+        'date_from': parse_date_arg('von'), 'date_to': parse_date_arg('bis'),
+        'category': request.args.get('kategorie', '').strip() or None,
+        'project': request.args.get('projekt', '').strip() or None,
+    }
+
+# --- Zeiterfassung: Keyset-Paginierung ---
+TIME_ENTRIES_PER_PAGE = 50
+
+def encode_entry_cursor(entry):
+    return f"{entry.date.isoformat()}_{entry.start_time.strftime('%H:%M:%S.%f')}_{entry.id}"
+
+def decode_entry_cursor(cursor):
+    entry_date, start_time, entry_id = cursor.split('_')
+    return date.fromisoformat(entry_date), time.fromisoformat(start_time), int(entry_id)
+
+def time_entry_page(cursor=None, limit=TIME_ENTRIES_PER_PAGE, **filters):
+    """Liefert (Einträge, nächster Cursor) absteigend nach (date, start_time, id), beginnend nach dem Cursor."""
+    query = filter_time_entries(TimeEntry.query, **filters)
+    if cursor:
+        query = query.filter(tuple_(TimeEntry.date, TimeEntry.start_time, TimeEntry.id) < tuple_(*decode_entry_cursor(cursor)))
+    entries = query.order_by(TimeEntry.date.desc(), TimeEntry.start_time.desc(), TimeEntry.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_entry_cursor(entries[limit - 1]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
+# --- Zeiterfassung: Export ---
+TIME_EXPORT_COLUMNS = ['Datum', 'Start', 'Ende', 'Dauer (HH:MM)', 'Dauer (Stunden)', 'Kategorie', 'Projekt', 'Infotext']
+
+def iter_time_export_rows(**filters):
+    """Liefert die Exportzeilen über einen serverseitigen Cursor (yield_per), ohne alle Einträge zu laden."""
+    query = filter_time_entries(db.session.query(
+        TimeEntry.date, TimeEntry.start_time, TimeEntry.end_time, entry_duration_seconds,
+        TimeEntry.category, TimeEntry.project, TimeEntry.info_text
+    ), **filters).order_by(TimeEntry.date, TimeEntry.start_time, TimeEntry.id).yield_per(1000)
+    for entry_date, start_time, end_time, seconds, category, project, info_text in query:
+        hours, minutes = divmod(int(seconds) // 60, 60)
+        yield [entry_date, start_time.strftime('%H:%M'), end_time.strftime('%H:%M'), f"{hours:02}:{minutes:02}",
+               round(seconds / 3600, 2), category, project, info_text or '']
+
+def stream_time_csv(rows, chunk_size=500):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff') # BOM, damit Excel die Datei als UTF-8 erkennt
+    writer.writerow(TIME_EXPORT_COLUMNS)
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0); buffer.truncate()
+    yield buffer.getvalue()
+
+def write_time_xlsx(rows):
+    """Schreibt die Zeilen im write-only-Modus von openpyxl in eine temporäre Datei und gibt diese zurück."""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Zeiterfassung')
+    sheet.append(TIME_EXPORT_COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+# --- Zeiterfassung: Import ---
+TIME_IMPORT_CHUNK_SIZE = 5000
+TIME_IMPORT_MAX_REPORTED_ERRORS = 100
+# Spaltennamen des Modells sowie die deutschen Überschriften aus dem Export
+TIME_IMPORT_COLUMN_ALIASES = {
+    'date': 'date', 'datum': 'date',
+    'start_time': 'start_time', 'start': 'start_time', 'beginn': 'start_time',
+    'end_time': 'end_time', 'ende': 'end_time',
+    'category': 'category', 'kategorie': 'category',
+    'project': 'project', 'projekt': 'project',
+    'info_text': 'info_text', 'infotext': 'info_text',
+}
+TIME_IMPORT_REQUIRED = ('date', 'start_time', 'end_time', 'category', 'project')
+TIME_IMPORT_MAX_LENGTHS = {'category': ('Kategorie', 50), 'project': ('Projekt', 100), 'info_text': ('Infotext', 300)}
+TIME_PATTERN = r'^(\d{1,2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?$'
+
+def read_time_import_file(file_storage):
+    """Liest CSV, XLSX oder eine SQLite-Datenbank (Tabelle time_entry) als DataFrame mit Textspalten ein."""
+    import pandas as pd
+    extension = os.path.splitext(file_storage.filename or '')[1].lower()
+    if extension == '.csv':
+        raw = file_storage.read()
+        first_line = raw.split(b'\n', 1)[0]
+        df = pd.read_csv(BytesIO(raw), sep=';' if first_line.count(b';') >= first_line.count(b',') else ',',
+                         dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    elif extension in ('.xlsx', '.xlsm'):
+        df = pd.read_excel(file_storage, dtype=str).fillna('')
+    elif extension in ('.db', '.sqlite', '.sqlite3'):
+        with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as tmp:
+            file_storage.save(tmp)
+        try:
+            con = sqlite3.connect(tmp.name)
+            try:
+                df = pd.read_sql_query('SELECT date, start_time, end_time, category, project, info_text FROM time_entry', con)
+            finally:
+                con.close()
+        except (sqlite3.DatabaseError, pd.errors.DatabaseError) as e:
+            raise ValueError(f"Die Datenbank enthält keine lesbare Tabelle time_entry ({e}).")
+        finally:
+            os.remove(tmp.name)
+        df = df.fillna('').astype(str)
+    else:
+        raise ValueError('Nur CSV-, Excel- (.xlsx) oder SQLite-Dateien (.db) können importiert werden.')
+    df = df.rename(columns=lambda c: TIME_IMPORT_COLUMN_ALIASES.get(str(c).strip().lower(), str(c)))
+    missing = [column for column in TIME_IMPORT_REQUIRED if column not in df.columns]
+    if missing:
+        raise ValueError(f"Fehlende Spalten: {', '.join(missing)}")
+    if 'info_text' not in df.columns:
+        df['info_text'] = ''
+    return df[list(TIME_IMPORT_REQUIRED) + ['info_text']].apply(lambda column: column.str.strip())
+
+def parse_time_column(values):
+    """Wandelt 'HH:MM', 'HH:MM:SS' und 'HH:MM:SS.ffffff' spaltenweise in time-Objekte um (None bei Fehlern)."""
+    import pandas as pd
+    parts = values.str.extract(TIME_PATTERN)
+    hours, minutes = pd.to_numeric(parts[0]), pd.to_numeric(parts[1])
+    seconds = pd.to_numeric(parts[2]).fillna(0)
+    micros = pd.to_numeric(parts[3].str.ljust(6, '0')).fillna(0)
+    valid = hours.lt(24) & minutes.lt(60) & seconds.lt(60)
+    result = pd.Series(None, index=values.index, dtype=object)
+    result[valid] = [time(int(h), int(m), int(s), int(us)) for h, m, s, us in
+                     zip(hours[valid], minutes[valid], seconds[valid], micros[valid])]
+    return result
+
+def validate_time_import(df):
+    """Prüft alle Zeilen spaltenweise und liefert (gültige Datensätze, Fehlerliste [(Zeile, Meldung)])."""
+    import numpy as np
+    import pandas as pd
+    # Datumsangaben im ISO-Format (auch mit Uhrzeit aus Excel) oder deutsch als TT.MM.JJJJ
+    dates = pd.to_datetime(df['date'], format='ISO8601', errors='coerce')
+    dates = dates.fillna(pd.to_datetime(df['date'], format='%d.%m.%Y', errors='coerce'))
+    start_times, end_times = parse_time_column(df['start_time']), parse_time_column(df['end_time'])
+    checks = [
+        (dates.isna(), 'Ungültiges Datum'),
+        (start_times.isna(), 'Ungültige Startzeit'),
+        (end_times.isna(), 'Ungültige Endzeit'),
+        (df['category'].eq(''), 'Kategorie fehlt'),
+        (df['project'].eq(''), 'Projekt fehlt'),
+    ] + [(df[column].str.len().gt(max_length), f"{label} länger als {max_length} Zeichen")
+         for column, (label, max_length) in TIME_IMPORT_MAX_LENGTHS.items()]
+    invalid = np.zeros(len(df), dtype=bool)
+    errors = []
+    for mask, message in checks:
+        mask = mask.to_numpy()
+        invalid |= mask
+        # Zeilennummern wie in der Datei: Kopfzeile ist Zeile 1
+        errors.extend((int(row) + 2, message) for row in np.flatnonzero(mask))
+    errors.sort()
+
+    valid = ~invalid
+    records = [
+        {'date': d, 'start_time': s, 'end_time': e, 'category': c, 'project': p, 'info_text': i or None}
+        for d, s, e, c, p, i in zip(dates[valid].dt.date, start_times[valid], end_times[valid],
+                                    df['category'][valid], df['project'][valid], df['info_text'][valid])
+    ]
+    return records, errors
+
+def import_time_entries(records):
+    """Fügt die Datensätze blockweise per executemany in einer einzigen Transaktion ein."""
+    try:
+        for offset in range(0, len(records), TIME_IMPORT_CHUNK_SIZE):
+            db.session.execute(insert(TimeEntry), records[offset:offset + TIME_IMPORT_CHUNK_SIZE])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(records)
+
+# --- Zeiterfassung: PDF-Bericht ---
+TIME_REPORT_CACHE_SIZE = 8
+_time_report_cache = OrderedDict() # (Datenstand, Datum, Bearbeiter, Filter) -> PDF-Bytes
+_time_report_cache_lock = threading.Lock()
+# FPDF 1.7 hält alle Seiten bis output() im Speicher; der Einzelnachweis wird daher begrenzt (ca. 140 Seiten).
+# Die Summen bleiben vollständig, die vollständigen Einträge liefert der CSV-Export.
+TIME_REPORT_MAX_DETAIL_ROWS = 5000
+TIME_REPORT_COLUMNS = [('Datum', 22), ('Start', 13), ('Ende', 13), ('Dauer', 15), ('Kategorie', 27), ('Projekt', 40), ('Infotext', 60)]
+
+def pdf_text(pdf_obj, text, width=None):
+    """Macht Text für die Latin-1-Schriften von FPDF druckbar und kürzt ihn bei Bedarf auf die Spaltenbreite."""
+    text = str(text).encode('latin-1', 'replace').decode('latin-1')
+    if width is not None and pdf_obj.get_string_width(text) > width - 2:
+        while text and pdf_obj.get_string_width(text + '...') > width - 2:
+            text = text[:-1]
+        text += '...'
+    return text
+
+def draw_time_totals_table(pdf_obj, title, totals):
+    pdf_obj.set_font('Arial', 'B', 12); pdf_obj.cell(0, 10, pdf_text(pdf_obj, title), 0, 1)
+    pdf_obj.set_font('Arial', 'B', 10)
+    pdf_obj.cell(120, 8, 'Bezeichnung', 1, 0); pdf_obj.cell(40, 8, 'Stunden', 1, 1, 'R')
+    pdf_obj.set_font('Arial', '', 10)
+    for label, hours in totals:
+        if pdf_obj.get_y() + 8 > pdf_obj.h - pdf_obj.b_margin: pdf_obj.add_page()
+        pdf_obj.cell(120, 8, pdf_text(pdf_obj, label, 120), 1, 0); pdf_obj.cell(40, 8, f"{hours:.2f}", 1, 1, 'R')
+    pdf_obj.ln(6)
+
+def build_time_report_pdf(bearbeiter, **filters):
+    """Zeitbericht: Deckblatt, Summen je Projekt und Kategorie (aus SQL) und eine Detailtabelle.
+
+    Die Detailzeilen werden per yield_per aus der Datenbank gelesen und Seite für Seite gezeichnet. Da FPDF das
+    ganze Dokument im Speicher aufbaut, enthält die Tabelle höchstens TIME_REPORT_MAX_DETAIL_ROWS Einträge.
+    """
+    from fpdf import FPDF
+    pdf = FPDF(orientation='P', unit='mm', format='A4')
+    create_pdf_cover(pdf, bearbeiter, "Zeiterfassung")
+    pdf.add_page()
+
+    category_totals = time_totals('category', **filters)
+    pdf.set_font('Arial', 'B', 14); pdf.cell(0, 10, 'Zusammenfassung', 0, 1)
+    pdf.set_font('Arial', '', 10)
+    date_from, date_to = filters.get('date_from'), filters.get('date_to')
+    if date_from or date_to:
+        period = f"{date_from.strftime('%d.%m.%Y') if date_from else '...'} - {date_to.strftime('%d.%m.%Y') if date_to else '...'}"
+        pdf.cell(0, 7, f"Zeitraum: {period}", 0, 1)
+    for label, key in (('Kategorie', 'category'), ('Projekt', 'project')):
+        if filters.get(key): pdf.cell(0, 7, pdf_text(pdf, f"{label}: {filters[key]}"), 0, 1)
+    pdf.cell(0, 7, f"Gesamtstunden: {sum(hours for _, hours in category_totals):.2f}", 0, 1)
+    pdf.ln(4)
+    draw_time_totals_table(pdf, 'Stunden je Projekt', time_totals('project', **filters))
+    draw_time_totals_table(pdf, 'Stunden je Kategorie', category_totals)
+
+    def draw_detail_header():
+        pdf.set_font('Arial', 'B', 9)
+        for title, width in TIME_REPORT_COLUMNS: pdf.cell(width, 8, title, 1, 0, 'C')
+        pdf.ln()
+        pdf.set_font('Arial', '', 8)
+
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 14); pdf.cell(0, 10, 'Einzelnachweis', 0, 1)
+    entry_count = filter_time_entries(db.session.query(func.count(TimeEntry.id)), **filters).scalar()
+    if entry_count > TIME_REPORT_MAX_DETAIL_ROWS:
+        pdf.set_font('Arial', '', 9)
+        pdf.multi_cell(0, 5, f"Aufgeführt sind die ersten {TIME_REPORT_MAX_DETAIL_ROWS} von {entry_count} Einträgen; die Summen oben "
+                             "umfassen alle Einträge. Für den vollständigen Nachweis den CSV-Export verwenden oder den Zeitraum einschränken.")
+        pdf.ln(2)
+    draw_detail_header()
+    rows = iter_time_export_rows(**filters)
+    for entry_date, start, end, duration, _, category, project, info_text in itertools.islice(rows, TIME_REPORT_MAX_DETAIL_ROWS):
+        if pdf.get_y() + 7 > pdf.h - pdf.b_margin:
+            pdf.add_page(); draw_detail_header()
+        values = [entry_date.strftime('%d.%m.%Y'), start, end, duration, category, project, info_text]
+        for (_, width), value in zip(TIME_REPORT_COLUMNS, values):
+            pdf.cell(width, 7, pdf_text(pdf, value, width), 1, 0, 'L')
+        pdf.ln()
+    rows.close()
+    return pdf.output(dest='S').encode('latin1')
+
+# --- Projektkonfiguration ---
+# Die Konfiguration liegt in der Tabelle 'project'; die Session enthält nur noch die Projekt-ID.
+def current_project():
+    """Liefert das Projekt der aktuellen Session (einmal pro Request geladen) oder None."""
+    if 'current_project' not in g:
+        project_id = session.get('project_id')
+        g.current_project = db.session.get(Project, project_id) if project_id is not None else None
+    return g.current_project
+
+def current_project_id():
+    project = current_project()
+    return project.id if project else None
+
+def get_project_config():
+    project = current_project()
+    return copy.deepcopy(project.config) if project else {}
+
+def project_config_for(project_id):
+    """Wie get_project_config(), aber ohne Session (z.B. für Hintergrundaufträge)."""
+    project = db.session.get(Project, project_id) if project_id is not None else None
+    return copy.deepcopy(project.config) if project else {}
+
+def save_project_config(config, name=None):
+    """Speichert die Konfiguration im aktuellen Projekt bzw. legt ein neues an (Commit durch den Aufrufer).
+
+    Ein neues Projekt übernimmt den Fragenkatalog (ohne Antworten) des zuletzt bearbeiteten Projekts.
+    """
+    project = current_project()
+    if project is None:
+        project = Project(name=name)
+        db.session.add(project)
+        db.session.flush()
+        seed_project_questions(project.id)
+    elif name:
+        project.name = name
+    project.config = config
+    db.session.flush()
+    session['project_id'] = project.id
+    g.current_project = project
+
+def seed_project_questions(project_id):
+    template_id = db.session.query(QuestionAnswer.project_id).join(Project, Project.id == QuestionAnswer.project_id).filter(
+        QuestionAnswer.project_id != project_id
+    ).order_by(Project.updated_at.desc()).limit(1).scalar()
+    if template_id is None: return
+    master_questions = QuestionAnswer.query.filter(
+        QuestionAnswer.project_id == template_id, QuestionAnswer.category_index == 1,
+        or_(QuestionAnswer.sasil_abgang_index.is_(None), QuestionAnswer.sasil_abgang_index == 1)
+    ).all()
+    provision_questions(project_id, (question_instance(q, q.category, 1, q.sasil_abgang_index) for q in master_questions))
+
+def config_from_questions(project_id):
+    """Leitet die Projektkonfiguration aus den vorhandenen Fragen-Instanzen ab (für Bestandsdaten)."""
+    config = {'num_trafos': 0, 'num_einspeisungen': 0, 'num_abgaenge': 0, 'num_sasil': 0, 'sasil_abgaenge_counts': {}}
+    config_keys = {'Trafo': 'num_trafos', 'Einspeisung': 'num_einspeisungen', 'Abgang': 'num_abgaenge', 'SASIL': 'num_sasil'}
+    rows = db.session.query(QuestionAnswer.category, QuestionAnswer.category_index, func.max(QuestionAnswer.sasil_abgang_index)).filter(
+        QuestionAnswer.project_id == project_id
+    ).group_by(QuestionAnswer.category, QuestionAnswer.category_index)
+    for category, category_index, max_abgang in rows:
+        if category not in config_keys: continue
+        config[config_keys[category]] = max(config[config_keys[category]], category_index)
+        if category == 'SASIL':
+            config['sasil_abgaenge_counts'][str(category_index)] = max_abgang or 1
+    return config
+
+def upgrade_fragen_schema():
+    """Überführt eine fragen.db ohne Projektbezug in das projektbezogene Schema.
+
+    Bestehende Fragen und Bezeichnungen werden einem Projekt 'Bestand' zugeordnet, dessen Konfiguration
+    aus den vorhandenen Instanzen abgeleitet wird. Mehrfach ausführbar.
+    """
+    engine = db.engines['fragen']
+    with engine.begin() as conn:
+        inspector = sa_inspect(conn)
+        if 'name' not in {c['name'] for c in inspector.get_columns('project')}:
+            conn.exec_driver_sql('ALTER TABLE project ADD COLUMN name VARCHAR(100)')
+        legacy_tables = [model.__table__ for model in (QuestionAnswer, ComponentName)
+                         if 'project_id' not in {c['name'] for c in inspector.get_columns(model.__tablename__)}]
+        if legacy_tables:
+            now = datetime.now(timezone.utc)
+            legacy_project_id = conn.execute(Project.__table__.insert().values(
+                name='Bestand', config={}, created_at=now, updated_at=now
+            )).inserted_primary_key[0]
+            for table in legacy_tables:
+                columns = ', '.join(c.name for c in table.columns if c.name != 'project_id')
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} RENAME TO {table.name}_legacy')
+                table.create(conn)
+                conn.exec_driver_sql(f'INSERT INTO {table.name} ({columns}, project_id) SELECT {columns}, ? FROM {table.name}_legacy', (legacy_project_id,))
+                conn.exec_driver_sql(f'DROP TABLE {table.name}_legacy')
+    if legacy_tables:
+        project = db.session.get(Project, legacy_project_id)
+        project.config = config_from_questions(legacy_project_id)
+        db.session.commit()
 
+# --- Daten.xlsx Cache ---
+DATEN_XLSX = os.path.join(basedir, 'Daten.xlsx')
+_workbook_cache = {}
+_workbook_cache_lock = threading.Lock()
+
+def load_cached_by_mtime(key, path, loader):
+    """Liefert loader() aus dem Prozess-Cache und lädt nur neu, wenn sich die mtime von path geändert hat."""
+    mtime = os.stat(path).st_mtime_ns
+    with _workbook_cache_lock:
+        cached = _workbook_cache.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, loader())
+            _workbook_cache[key] = cached
+        return cached[1]
+
+class TermIndex:
+    """Sortierter Index der Begriffe (Schlüssel: kleingeschriebener Begriff) für exakte Suche und Präfixsuche."""
+    def __init__(self, rows):
+        self._explanations = {}
+        entries = set()
+        for term, explanation in rows:
+            key = term.lower()
+            self._explanations.setdefault(key, explanation)
+            entries.add((key, term))
+        self._entries = sorted(entries)
+        self._keys = [key for key, _ in self._entries]
+
+    def __contains__(self, term):
+        return term.lower() in self._explanations
+
+    def lookup(self, term):
+        return self._explanations.get(term.lower())
+
+    def prefix(self, prefix, limit=10):
+        prefix = prefix.lower()
+        suggestions = []
+        for key, term in self._entries[bisect.bisect_left(self._keys, prefix):]:
+            if not key.startswith(prefix) or len(suggestions) >= limit: break
+            suggestions.append(term)
+        return suggestions
+
+def load_term_index():
+    def build():
+        import pandas as pd
+        df = pd.read_excel(DATEN_XLSX, sheet_name='Begriffe', header=None)
+        search_area = df.iloc[13:]
+        return TermIndex((str(term), str(explanation) if pd.notna(explanation) else None)
+                         for term, explanation in zip(search_area[3], search_area[7]) if pd.notna(term))
+    return load_cached_by_mtime('begriffe', DATEN_XLSX, build)
+
+# --- Diagramme (visuals/) ---
+VISUALS_DIR = os.path.join(basedir, 'visuals')
+DRAWIO_VIEWER_OPTIONS = {"background": "#ffffff", "toolbar": "top", "lightbox": False, "transparent": False}
+
+class Diagram:
+    """Vorab serialisierte Viewer-Konfiguration einer .drawio-Datei."""
+    def __init__(self, xml_content):
+        self.data = json.dumps({"xml": xml_content, **DRAWIO_VIEWER_OPTIONS})
+        self.compressed = {} # Template -> (ETag, gzip-HTML) der zuletzt ausgelieferten Seite
+
+def load_diagram(filename):
+    """Lädt eine Zeichnung aus visuals/ über den mtime-Cache. Pfade außerhalb des Ordners gelten als nicht vorhanden."""
+    filepath = safe_join(VISUALS_DIR, filename)
+    if filepath is None or not filename.endswith('.drawio') or not os.path.isfile(filepath):
+        raise FileNotFoundError(filename)
+    def loader():
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return Diagram(f.read())
+    return load_cached_by_mtime(('drawio', filename), filepath, loader)
+
+def render_diagram_page(template_name, filename):
+    try:
+        diagram = load_diagram(filename)
+    except FileNotFoundError:
+        flash(f"Zeichnung '{filename}' nicht gefunden.", "error")
+        return redirect(url_for('index'))
+    # Die Seite wird jedes Mal gerendert (Änderungen an Templates und Layout sowie Meldungen erscheinen sofort);
+    # zwischengespeichert ist nur die serialisierte Zeichnung. Das ETag folgt dem Inhalt der gerenderten Seite.
+    html = render_template(template_name, diagram_data=diagram.data, drawing_name=filename).encode('utf-8')
+    etag = hashlib.sha1(html).hexdigest()
+    response = Response(html, mimetype='text/html')
+    if 'gzip' in request.accept_encodings:
+        cached_etag, compressed = diagram.compressed.get(template_name, (None, None))
+        if cached_etag != etag:
+            compressed = gzip.compress(html)
+            diagram.compressed[template_name] = (etag, compressed)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = 'gzip'
+        etag += '-gz'
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# --- Filter-Katalog (Lösungsfilter) ---
+FILTER_CATEGORY_CONFIGS = {
+    'Trafo': {'sheet_name': 'Filter_Trafo', 'header_row': 14, 'data_start_row': 15, 'solution_start_col': 26},
+    'Einspeisung': {'sheet_name': 'Filter_Einspeisung', 'header_row': 14, 'data_start_row': 15, 'solution_start_col': 26},
+    'Abgang': {'sheet_name': 'Filter_Abgang', 'header_row': 14, 'data_start_row': 15, 'solution_start_col': 26},
+    'SASIL': {'sheet_name': 'Filter_Sasil', 'header_row': 14, 'data_start_row': 15, 'solution_start_col': 26}
+}
+
+VOLTAGE_QUESTION = "Spannungsversorgung des Messgerätes?"
+HARMONIC_QUESTION = "Bis zur wie vielten Oberschwingung soll gemessen werden?"
+VOLTAGE_TYPES = ('AC/DC', 'AC', 'DC', 'UNKNOWN')
+
+CATALOG_MASK_CACHE_SIZE = 4096 # gemerkte Zeilenmasken je Tabellenblatt
+
+class CatalogSheet:
+    """Ein einmalig eingelesenes Filter-Tabellenblatt: Spalten nach Fragetext benannt, Lösungen ab solution_start_col.
+
+    Die Fragespalten werden beim Laden vorverarbeitet, damit jede Antwort als NumPy-Maske über alle Zeilen
+    ausgewertet werden kann (siehe match()). Textspalten werden dabei in Codes und eindeutige Zellinhalte zerlegt:
+    die Teilstring-Suche läuft nur über die eindeutigen Inhalte, die fertige Maske wird je (Frage, Antwort) gemerkt.
+
+    Eine leere Fragezelle bedeutet: die Katalogzeile stellt an diese Frage keine Anforderung, sie passt zu jeder
+    Antwort (wie na=True bzw. isna() im ursprünglichen pandas-Filter). Zeilen ohne jeden Lösungseintrag (Leerzeilen
+    am Tabellenende) werden beim Laden verworfen; sie würden sonst jeden Filter passieren, ohne je eine Lösung zu liefern.
+    """
+    def __init__(self, df_sheet, config):
+        import numpy as np
+        import pandas as pd
+        header_series = df_sheet.iloc[config['header_row']]
+        self.data = df_sheet.iloc[config['data_start_row']:].reset_index(drop=True)
+        self.data.columns = [str(h).strip() if pd.notna(h) else '' for h in header_series]
+        self.solution_start_col = config['solution_start_col']
+        has_solution = self.data.iloc[:, self.solution_start_col:].notna().any(axis=1).to_numpy()
+        self.data = self.data[has_solution].reset_index(drop=True)
+        self.row_count = len(self.data)
+
+        self._missing = {}       # Fragetext -> Maske leerer Zellen (leere Zellen filtern nie heraus)
+        self._text_index = {}    # Fragetext -> (Code je Zeile, eindeutige Zellinhalte in Großbuchstaben)
+        self._voltage_specs = {} # Fragetext -> (Zeile, min_v, max_v, Typ-Code) je Spannungsbereich
+        self._max_harmonic = {}  # Fragetext -> höchste Zahl in der Zelle, -1 wenn keine
+        self._masks = {}         # (Fragetext, normalisierte Antwort) -> Zeilenmaske
+        for pos, column in enumerate(self.data.columns[:self.solution_start_col]):
+            if not column or column in self._missing: continue
+            values = self.data.iloc[:, pos]
+            self._missing[column] = values.isna().to_numpy()
+            texts = ['' if missing else str(value) for value, missing in zip(values, self._missing[column])]
+            codes, uniques = pd.factorize(np.array([text.upper() for text in texts], dtype=object))
+            self._text_index[column] = (codes, np.array(uniques, dtype=str))
+            if column == VOLTAGE_QUESTION:
+                specs = [(row, s['min_v'], s['max_v'], VOLTAGE_TYPES.index(s['type']))
+                         for row, text in enumerate(texts) for s in parse_voltage_string(text)]
+                self._voltage_specs[column] = tuple(np.array(part, dtype=np.int64) for part in zip(*specs)) if specs else (np.empty(0, dtype=np.int64),) * 4
+            elif column == HARMONIC_QUESTION:
+                self._max_harmonic[column] = np.array([max((int(n) for n in re.findall(r'(\d+)', text)), default=-1) for text in texts], dtype=np.int64)
+
+    def match(self, question, answer):
+        """Liefert die (schreibgeschützte) Zeilenmaske für eine Antwort oder None, wenn Frage bzw. Antwort
+        nicht ausgewertet werden kann."""
+        if question not in self._missing: return None
+        if question in self._voltage_specs:
+            key = parse_voltage_answer(answer)
+        elif question in self._max_harmonic:
+            key = parse_harmonic_answer(answer)
+        else:
+            key = answer.upper()
+        if key is None: return None
+        mask = self._masks.get((question, key))
+        if mask is None:
+            if len(self._masks) >= CATALOG_MASK_CACHE_SIZE: self._masks.clear()
+            mask = self._build_mask(question, key)
+            mask.setflags(write=False)
+            self._masks[(question, key)] = mask
+        return mask
+
+    def _build_mask(self, question, key):
+        import numpy as np
+        missing = self._missing[question]
+        if question in self._voltage_specs:
+            user_voltage, user_type = key
+            rows, min_v, max_v, type_codes = self._voltage_specs[question]
+            allowed_types = np.array([user_type in v_type for v_type in VOLTAGE_TYPES])
+            hits = (min_v <= user_voltage) & (user_voltage <= max_v) & allowed_types[type_codes]
+            mask = missing.copy()
+            mask[rows[hits]] = True
+            return mask
+        if question in self._max_harmonic:
+            return missing | (self._max_harmonic[question] >= key)
+        codes, uniques = self._text_index[question]
+        return missing | (np.char.find(uniques, key) >= 0)[codes]
+
+    def predicate(self, question):
+        """Bezeichnung der Auswertung, die match() für die Frage verwendet."""
+        if question not in self._missing: return 'Spalte fehlt'
+        if question in self._voltage_specs: return 'Spannungsbereich'
+        if question in self._max_harmonic: return 'Oberschwingung'
+        return 'Teilstring'
+
+    def filter_rows(self, answers, trace=None):
+        """Liefert die Zeilenindizes, die alle (Frage, Antwort)-Paare erfüllen.
+
+        Ist trace eine Liste, wird je Antwort ein Schritt mit Zeilen vorher/nachher, Dauer und Prädikat angehängt.
+        Gezählt werden nur Katalogzeilen mit Lösung, Leerzeilen verwirft bereits __init__().
+        """
+        import numpy as np
+        row_mask = np.ones(self.row_count, dtype=bool)
+        for question, answer in answers:
+            if trace is not None:
+                rows_before, started = int(row_mask.sum()), perf_counter()
+            condition = self.match(question, answer)
+            if condition is not None:
+                row_mask &= condition
+            if trace is not None:
+                trace.append({
+                    'question': question, 'answer': answer,
+                    'predicate': self.predicate(question) if condition is not None or question not in self._missing else 'nicht auswertbar',
+                    'rows_before': rows_before, 'rows_after': int(row_mask.sum()),
+                    'elapsed_ms': round((perf_counter() - started) * 1000, 3),
+                })
+        return np.flatnonzero(row_mask)
+
+    def solutions(self, rows):
+        return self.data.iloc[rows, self.solution_start_col:].dropna(how='all', axis=1).dropna(how='all', axis=0)
+
+def load_filter_catalog():
+    """Liefert {Kategorie: CatalogSheet}; fehlende Tabellenblätter sind nicht enthalten."""
+    def build():
+        import pandas as pd
+        catalog = {}
+        with pd.ExcelFile(DATEN_XLSX) as workbook:
+            for category, config in FILTER_CATEGORY_CONFIGS.items():
+                if config['sheet_name'] in workbook.sheet_names:
+                    catalog[category] = CatalogSheet(workbook.parse(config['sheet_name'], header=None), config)
+        return catalog
+    return load_cached_by_mtime('filter_catalog', DATEN_XLSX, build)
+
+def load_component_answers(project_id, categories):
+    """Lädt alle auswertbaren Antworten der Kategorien mit einer Abfrage, gruppiert nach (Kategorie, Index, SASIL-Abgang)."""
+    rows = db.session.query(
+        QuestionAnswer.category, QuestionAnswer.category_index, QuestionAnswer.sasil_abgang_index,
+        QuestionAnswer.question, QuestionAnswer.answer
+    ).filter(
+        QuestionAnswer.project_id == project_id,
+        QuestionAnswer.category.in_(categories),
+        QuestionAnswer.answer.isnot(None),
+        QuestionAnswer.answer != '',
+        QuestionAnswer.answer != 'nicht Relevant'
+    ).order_by(QuestionAnswer.id)
+    component_answers = {}
+    for category, category_index, sasil_abgang_index, question, answer in rows:
+        key = (category, category_index, sasil_abgang_index if category == 'SASIL' else None)
+        component_answers.setdefault(key, []).append((question.strip(), answer.strip()))
+    return component_answers
+
+# --- Lösungsvorschau ---
+# Je Komponente bleibt ein Filterzustand im Speicher, damit beim Ausfüllen nur die geänderte Antwort neu ausgewertet wird.
+SOLUTION_PREVIEW_STATES = 256 # gemerkte Komponenten
+SOLUTION_PREVIEW_ROWS = 5     # angezeigte Lösungen
+_solution_preview_states = OrderedDict() # (Projekt, Kategorie, Index, SASIL-Abgang) -> SolutionPreviewState
+_solution_preview_lock = threading.Lock()
+
+class SolutionPreviewState:
+    """Inkrementeller Filterzustand einer Komponente: zählt je Katalogzeile, wie viele Antworten sie ausschließen.
+
+    Eine Zeile ist Kandidat, solange ihr Zähler 0 ist. Ändert sich eine Antwort, wird nur deren alte Maske
+    herausgerechnet und die neue hinzugefügt.
+    """
+    def __init__(self, catalog_sheet):
+        import numpy as np
+        self.sheet = catalog_sheet
+        self.fail_counts = np.zeros(catalog_sheet.row_count, dtype=np.int32)
+        self.answers = {} # Fragetext -> Antwort
+        self.masks = {}   # Fragetext -> Zeilenmaske der Antwort (nur auswertbare Antworten)
+
+    def set_answers(self, answers):
+        """Übernimmt den vollständigen Antwortsatz {Fragetext: Antwort}; liefert die Anzahl geänderter Antworten."""
+        changed = 0
+        for question in set(self.answers) | set(answers):
+            answer = answers.get(question)
+            if self.answers.get(question) == answer: continue
+            changed += 1
+            old_mask = self.masks.pop(question, None)
+            if old_mask is not None: self.fail_counts[~old_mask] -= 1
+            if answer is None:
+                del self.answers[question]
+                continue
+            self.answers[question] = answer
+            mask = self.sheet.match(question, answer)
+            if mask is not None:
+                self.fail_counts[~mask] += 1
+                self.masks[question] = mask
+        return changed
+
+    def rows(self):
+        import numpy as np
+        return np.flatnonzero(self.fail_counts == 0)
+
+def solution_preview(project_id, category, category_index, sasil_abgang_index, answers):
+    """Wertet den (ungespeicherten) Antwortsatz einer Komponente gegen den Lösungskatalog aus."""
+    import pandas as pd
+    catalog_sheet = load_filter_catalog().get(category)
+    if catalog_sheet is None: return None
+    # Gleiche Normalisierung wie load_component_answers()
+    answers = {question.strip(): answer.strip() for question, answer in answers if answer and answer.strip() and answer != 'nicht Relevant'}
+    key = (project_id, category, category_index, sasil_abgang_index)
+    with _solution_preview_lock:
+        state = _solution_preview_states.pop(key, None)
+        if state is None or state.sheet is not catalog_sheet: # Daten.xlsx wurde geändert
+            state = SolutionPreviewState(catalog_sheet)
+        _solution_preview_states[key] = state
+        while len(_solution_preview_states) > SOLUTION_PREVIEW_STATES:
+            _solution_preview_states.popitem(last=False)
+        changed = state.set_answers(answers)
+        solutions = catalog_sheet.solutions(state.rows())
+    top = solutions.head(SOLUTION_PREVIEW_ROWS)
+    return {
+        'count': len(solutions),
+        'answered': len(answers),
+        'changed': changed,
+        'columns': [str(column) for column in top.columns],
+        'solutions': [['' if pd.isna(value) else str(value) for value in row] for row in top.itertuples(index=False)],
+    }
+
+# --- Fragen-Provisionierung ---
+def provision_questions(project_id, candidates):
+    """Legt fehlende Fragen-Instanzen eines Projekts gesammelt an und gibt die Anzahl neu angelegter Zeilen zurück.
+
+    candidates: Dicts mit category, category_index, sasil_abgang_index, question, options, sort_index.
+    Bereits vorhandene Instanzen werden mit einer einzigen Abfrage ermittelt, die fehlenden mit einem
+    INSERT ... ON CONFLICT DO NOTHING (executemany) eingefügt.
+    """
+    candidates = list(candidates)
+    if not candidates: return 0
+    existing = set(db.session.query(
+        QuestionAnswer.category, QuestionAnswer.category_index, QuestionAnswer.sasil_abgang_index, QuestionAnswer.question
+    ).filter(QuestionAnswer.project_id == project_id, QuestionAnswer.category.in_({c['category'] for c in candidates})))
+    missing = []
+    for candidate in candidates:
+        key = (candidate['category'], candidate['category_index'], candidate['sasil_abgang_index'], candidate['question'])
+        if key not in existing:
+            existing.add(key)
+            missing.append(dict(candidate, project_id=project_id))
+    if missing:
+        db.session.execute(sqlite_insert(QuestionAnswer).on_conflict_do_nothing(), missing)
+    return len(missing)
+
+def question_instance(master_q, category, category_index, sasil_abgang_index):
+    return {'category': category, 'category_index': category_index, 'sasil_abgang_index': sasil_abgang_index,
+            'question': master_q.question, 'options': master_q.options, 'sort_index': master_q.sort_index}
+
+def save_answers_bulk(project_id, answers_by_id):
+    """Schreibt {Frage-ID: Antwort} eines Projekts mit einem einzigen UPDATE-executemany; liefert die Anzahl geänderter Zeilen."""
+    if not answers_by_id: return 0
+    table = QuestionAnswer.__table__
+    return db.session.execute(
+        update(table).where(table.c.id == bindparam('b_id'), table.c.project_id == project_id).values(answer=bindparam('b_answer')),
+        [{'b_id': q_id, 'b_answer': answer} for q_id, answer in answers_by_id.items()]
+    ).rowcount
+
+def copy_first_abgang_answers(project_id, sasil_index, num_abgaenge):
+    """Überträgt die Antworten von Abgang 1 eines SASIL-Feldes per UPDATE ... FROM auf die Abgänge 2..num_abgaenge."""
+    if num_abgaenge < 2: return
+    table = QuestionAnswer.__table__
+    source = table.alias('source')
+    db.session.execute(
+        update(table).where(
+            table.c.project_id == project_id, table.c.category == 'SASIL', table.c.category_index == sasil_index,
+            table.c.sasil_abgang_index.between(2, num_abgaenge),
+            source.c.project_id == project_id, source.c.category == 'SASIL', source.c.category_index == sasil_index,
+            source.c.sasil_abgang_index == 1, source.c.question == table.c.question
+        ).values(answer=source.c.answer)
+    )
 
 # --- Helper-Funktionen ---
 def parse_voltage_string(voltage_str):
@@ -108,6 +915,15 @@ def parse_voltage_string(voltage_str):
         specs.append({'min_v': min_v, 'max_v': max_v, 'type': v_type})
     return specs
 
+def parse_voltage_answer(answer):
+    match = re.search(r'(\d+)\s*v?\s*(ac|dc|ac/dc)?', answer.lower())
+    if not match: return None
+    return int(match.group(1)), (match.group(2) or "ac/dc").upper()
+
+def parse_harmonic_answer(answer):
+    nums = re.findall(r'(\d+)', answer)
+    return max(int(n) for n in nums) if nums else None
+
 def create_pdf_cover(pdf_obj, bearbeiter_name, title):
     pdf_obj.add_page()
     logo_path = os.path.join(basedir, 'static', 'img', 'logo.png')
@@ -134,14 +950,7 @@ def index():
 @app.route('/Ablauf_Kunde/<string:filename>')
 def Ablauf_Kunde(filename):
     try:
-        filepath = os.path.join(basedir, 'visuals', filename)
-        with open(filepath, 'r', encoding='utf-8') as f: xml_content = f.read()
-        config = { "xml": xml_content, "background": "#ffffff", "toolbar": "top", "lightbox": False, "transparent": False }
-        diagram_data = json.dumps(config)
-        return render_template('Ablauf_Kunde.html', diagram_data=diagram_data, drawing_name=filename)
-    except FileNotFoundError:
-        flash(f"Zeichnung '{filename}' nicht gefunden.", "error")
-        return redirect(url_for('index'))
+        return render_diagram_page('Ablauf_Kunde.html', filename)
     except Exception as e:
         flash(f"Fehler beim Laden der Zeichnung: {e}", "error")
         return redirect(url_for('index'))
@@ -151,14 +960,7 @@ def Ablauf_Kunde(filename):
 @app.route('/Messung_Ablauf/<string:filename>')
 def Messung_Ablauf(filename):
     try:
-        filepath = os.path.join(basedir, 'visuals', filename)
-        with open(filepath, 'r', encoding='utf-8') as f: xml_content = f.read()
-        config = { "xml": xml_content, "background": "#ffffff", "toolbar": "top", "lightbox": False, "transparent": False }
-        diagram_data = json.dumps(config)
-        return render_template('Messung_Ablauf.html', diagram_data=diagram_data, drawing_name=filename)
-    except FileNotFoundError:
-        flash(f"Zeichnung '{filename}' nicht gefunden.", "error")
-        return redirect(url_for('index'))
+        return render_diagram_page('Messung_Ablauf.html', filename)
     except Exception as e:
         flash(f"Fehler beim Laden der Zeichnung: {e}", "error")
         return redirect(url_for('index'))
@@ -167,14 +969,7 @@ def Messung_Ablauf(filename):
 @app.route('/Messung_1_Aufbau/<string:filename>')
 def Messung_1_Aufbau(filename):
     try:
-        filepath = os.path.join(basedir, 'visuals', filename)
-        with open(filepath, 'r', encoding='utf-8') as f: xml_content = f.read()
-        config = { "xml": xml_content, "background": "#ffffff", "toolbar": "top", "lightbox": False, "transparent": False }
-        diagram_data = json.dumps(config)
-        return render_template('Messung_1_Aufbau.html', diagram_data=diagram_data, drawing_name=filename)
-    except FileNotFoundError:
-        flash(f"Zeichnung '{filename}' nicht gefunden.", "error")
-        return redirect(url_for('index'))
+        return render_diagram_page('Messung_1_Aufbau.html', filename)
     except Exception as e:
         flash(f"Fehler beim Laden der Zeichnung: {e}", "error")
         return redirect(url_for('index'))
@@ -196,12 +991,10 @@ def begriffsfinder():
             flash("Bitte geben Sie einen Suchbegriff ein.", "error")
         else:
             try:
-                df = pd.read_excel('Daten.xlsx', sheet_name='Begriffe', header=None)
-                search_area = df.iloc[13:]
-                match = search_area[search_area[3].astype(str).str.lower() == search_term.lower()]
-                if not match.empty:
-                    explanation = match.iloc[0, 7]
-                    result = str(explanation) if pd.notna(explanation) else "Keine Erklärung für diesen Begriff vorhanden."
+                term_index = load_term_index()
+                if search_term in term_index:
+                    explanation = term_index.lookup(search_term)
+                    result = explanation if explanation is not None else "Keine Erklärung für diesen Begriff vorhanden."
                 else:
                     result = "Begriff nicht gefunden."
             except FileNotFoundError:
@@ -216,10 +1009,7 @@ def autocomplete_begriffe():
     suggestions = []
     if query:
         try:
-            df = pd.read_excel('Daten.xlsx', sheet_name='Begriffe', header=None)
-            search_area = df.iloc[13:]
-            matching_terms = search_area[search_area[3].astype(str).str.lower().str.startswith(query)].iloc[:, 3].unique()
-            suggestions = matching_terms.tolist()[:10]
+            suggestions = load_term_index().prefix(query, limit=10)
         except Exception:
             suggestions = []
     return jsonify(suggestions)
@@ -243,9 +1033,86 @@ def dokumentation():
             flash(f'Fehler beim Speichern: {e}', 'error')
         return redirect(url_for('dokumentation'))
 
-    entries = TimeEntry.query.order_by(TimeEntry.date.desc(), TimeEntry.start_time.desc()).all()
-    generate_category_chart(entries)
-    return render_template('dokumentation.html', entries=entries)
+    try:
+        filters = time_entry_filters_from_args()
+        entries, next_cursor = time_entry_page(request.args.get('cursor'), **filters)
+    except ValueError:
+        flash('Ungültiger Filter oder Seitenverweis.', 'error')
+        return redirect(url_for('dokumentation'))
+    filter_args = {key: value for key, value in request.args.items() if key in ('von', 'bis', 'kategorie', 'projekt') and value}
+    return render_template('dokumentation.html', entries=entries, next_cursor=next_cursor, filter_args=filter_args,
+                           is_first_page=not request.args.get('cursor'))
+
+@app.route('/api/zeiterfassung/eintraege')
+def time_entries_api():
+    try:
+        filters = time_entry_filters_from_args()
+        limit = min(max(int(request.args.get('limit', TIME_ENTRIES_PER_PAGE)), 1), 500)
+        entries, next_cursor = time_entry_page(request.args.get('cursor'), limit=limit, **filters)
+    except ValueError:
+        return jsonify({'error': 'Ungültiger Filter, Cursor oder Limit.'}), 400
+    return jsonify({
+        'entries': [{
+            'id': e.id, 'date': e.date.isoformat(), 'start_time': e.start_time.strftime('%H:%M'), 'end_time': e.end_time.strftime('%H:%M'),
+            'duration': e.duration_str, 'category': e.category, 'project': e.project, 'info_text': e.info_text
+        } for e in entries],
+        'next_cursor': next_cursor,
+    })
+
+@app.route('/api/zeiterfassung/statistik')
+def time_statistics():
+    try:
+        filters = time_entry_filters_from_args()
+    except ValueError:
+        return jsonify({'error': "Datum bitte im Format JJJJ-MM-TT angeben."}), 400
+    categories = time_totals('category', **filters)
+    return jsonify({
+        'total_hours': round(sum(hours for _, hours in categories), 2),
+        'categories': [{'category': category, 'hours': round(hours, 2)} for category, hours in categories],
+        'projects': [{'project': project, 'hours': round(hours, 2)} for project, hours in time_totals('project', **filters)],
+        'days': [{'date': day.isoformat(), 'hours': round(hours, 2)} for day, hours in time_totals('day', **filters)],
+    })
+
+@app.route('/zeiterfassung/export.<string:file_format>')
+def export_time_entries(file_format):
+    if file_format not in ('csv', 'xlsx'):
+        abort(404)
+    try:
+        filters = time_entry_filters_from_args()
+    except ValueError:
+        flash('Ungültiger Filter für den Export.', 'error')
+        return redirect(url_for('dokumentation'))
+    download_name = f"Zeiterfassung_{date.today().strftime('%Y-%m-%d')}.{file_format}"
+    if file_format == 'csv':
+        return Response(stream_with_context(stream_time_csv(iter_time_export_rows(**filters))), mimetype='text/csv; charset=utf-8',
+                        headers={'Content-Disposition': f'attachment; filename={download_name}'})
+    return send_file(write_time_xlsx(iter_time_export_rows(**filters)), as_attachment=True, download_name=download_name,
+                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+@app.route('/zeiterfassung/import', methods=['POST'])
+def import_time_entries_upload():
+    wants_json = wants_json_response()
+    file = request.files.get('import_file')
+    try:
+        if not file or not file.filename:
+            raise ValueError('Keine Datei ausgewählt.')
+        records, errors = validate_time_import(read_time_import_file(file))
+        imported = import_time_entries(records)
+    except Exception as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(f'Fehler beim Import: {e}', 'error')
+        return redirect(url_for('dokumentation'))
+
+    if wants_json:
+        return jsonify({'imported': imported, 'error_count': len(errors),
+                        'errors': [{'row': row, 'message': message} for row, message in errors[:TIME_IMPORT_MAX_REPORTED_ERRORS]]})
+    flash(f'{imported} Einträge importiert.', 'success')
+    if errors:
+        details = '; '.join(f'Zeile {row}: {message}' for row, message in errors[:10])
+        more = f' (und {len(errors) - 10} weitere)' if len(errors) > 10 else ''
+        flash(f'{len(errors)} Fehler, betroffene Zeilen wurden übersprungen: {details}{more}', 'error')
+    return redirect(url_for('dokumentation'))
 
 @app.route('/delete/<int:entry_id>', methods=['POST'])
 def delete_entry(entry_id):
@@ -271,7 +1138,30 @@ def delete_all_entries():
 
 @app.route('/generate_pdf')
 def generate_pdf():
-    pass
+    try:
+        filters = time_entry_filters_from_args()
+    except ValueError:
+        flash('Ungültiger Filter für den PDF-Export.', 'error')
+        return redirect(url_for('dokumentation'))
+    bearbeiter = request.args.get('bearbeiter', '').strip() or 'N/A'
+    # Das Deckblatt enthält das heutige Datum, daher gehört es mit zum Schlüssel. Der Datenstand ist nur
+    # zuverlässig, weil time_entry-IDs nie erneut vergeben werden (siehe time_entry_fingerprint()).
+    cache_key = (time_entry_fingerprint(), date.today(), bearbeiter, tuple(sorted(filters.items())))
+    with _time_report_cache_lock:
+        pdf_output = _time_report_cache.get(cache_key)
+        if pdf_output is not None:
+            _time_report_cache.move_to_end(cache_key)
+    if pdf_output is None:
+        try:
+            pdf_output = build_time_report_pdf(bearbeiter, **filters)
+        except Exception as e:
+            flash(f"Fehler beim Erstellen des PDFs: {e}", "error")
+            return redirect(url_for('dokumentation'))
+        with _time_report_cache_lock:
+            _time_report_cache[cache_key] = pdf_output
+            while len(_time_report_cache) > TIME_REPORT_CACHE_SIZE:
+                _time_report_cache.popitem(last=False)
+    return send_file(BytesIO(pdf_output), as_attachment=True, download_name='Zeiterfassung.pdf', mimetype='application/pdf')
 
 @app.route('/fragen', methods=['GET', 'POST'])
 @app.route('/fragen', methods=['GET', 'POST'])
@@ -283,12 +1173,12 @@ def fragen():
                 'num_einspeisungen': int(request.args.get('num_einspeisungen', 0)),
                 'num_abgaenge': int(request.args.get('num_abgaenge', 0)),
                 'num_sasil': int(request.args.get('num_sasil', 0)),
-                'sasil_abgaenge_counts': {}
             }
-            old_config = session.get('project_config', {})
-
-            for i in range(1, new_config['num_sasil'] + 1):
-                new_config['sasil_abgaenge_counts'][str(i)] = 1
+            new_config['sasil_abgaenge_counts'] = {str(i): 1 for i in range(1, new_config['num_sasil'] + 1)}
+            old_config = get_project_config()
+            # Vollständig vor dem Speichern aufbauen: Änderungen am JSON-Wert danach würden nicht erkannt
+            save_project_config(new_config, name=request.args.get('project_name', '').strip() or None)
+            project_id = current_project_id()
 
             categories_to_process = {
                 'Trafo': 'num_trafos',
@@ -296,23 +1186,22 @@ def fragen():
                 'Abgang': 'num_abgaenge',
                 'SASIL': 'num_sasil'
             }
+            master_questions = QuestionAnswer.query.filter(
+                QuestionAnswer.project_id == project_id,
+                QuestionAnswer.category.in_(categories_to_process), QuestionAnswer.category_index == 1
+            ).all()
+            candidates = []
             for cat, key in categories_to_process.items():
                 old_count = old_config.get(key, 0)
                 new_count = new_config.get(key, 0)
+                sasil_abgang_index = 1 if cat == 'SASIL' else None
+
+                for i in range(old_count + 1, new_count + 1):
+                    candidates.extend(question_instance(master_q, cat, i, sasil_abgang_index)
+                                      for master_q in master_questions
+                                      if master_q.category == cat and master_q.sasil_abgang_index == sasil_abgang_index)
+            provision_questions(project_id, candidates)
 
-                if new_count > old_count:
-                    master_questions = QuestionAnswer.query.filter_by(category=cat, category_index=1, sasil_abgang_index=None if cat != 'SASIL' else 1).all()
-                    for i in range(old_count + 1, new_count + 1):
-                        for master_q in master_questions:
-                            sasil_abgang_index = 1 if cat == 'SASIL' else None
-                            if not QuestionAnswer.query.filter_by(category=cat, category_index=i, sasil_abgang_index=sasil_abgang_index, question=master_q.question).first():
-                                db.session.add(QuestionAnswer(
-                                    category=cat, category_index=i, question=master_q.question,
-                                    options=master_q.options, sort_index=master_q.sort_index,
-                                    sasil_abgang_index=sasil_abgang_index
-                                ))
-
-            session['project_config'] = new_config
             db.session.commit()
             flash('Projektkonfiguration wurde aktualisiert.', 'success')
         except Exception as e:
@@ -320,12 +1209,12 @@ def fragen():
             flash(f"Fehler beim Konfigurieren: {e}", "error")
         return redirect(url_for('fragen'))
 
+    project_id = current_project_id()
+
     if request.method == 'POST':
         category = request.form.get('category', 'Allgemein')
         if 'save_answers' in request.form:
-            for key, value in request.form.items():
-                if key.startswith('answer_') and (entry := QuestionAnswer.query.get(int(key.split('_')[1]))):
-                    entry.answer = value
+            save_answers_bulk(project_id, {int(key.split('_')[1]): value for key, value in request.form.items() if key.startswith('answer_')})
             db.session.commit()
             flash('Antworten erfolgreich gespeichert!', 'success')
         elif 'new_question' in request.form:
@@ -335,9 +1224,10 @@ def fragen():
                 sasil_abgang_index_str = request.form.get('sasil_abgang_index')
                 sasil_abgang_index = int(sasil_abgang_index_str) if sasil_abgang_index_str else None
 
-                max_index = db.session.query(func.max(QuestionAnswer.sort_index)).filter_by(category=category).scalar() or 0
+                max_index = db.session.query(func.max(QuestionAnswer.sort_index)).filter_by(project_id=project_id, category=category).scalar() or 0
 
                 db.session.add(QuestionAnswer(
+                    project_id=project_id,
                     question=request.form.get('new_question'),
                     options=request.form.get('options'),
                     category=category,
@@ -356,11 +1246,11 @@ def fragen():
                 category = request.form.get('category')
                 category_index = int(request.form.get('category_index'))
                 name = request.form.get('component_name')
-                component = ComponentName.query.filter_by(category=category, category_index=category_index).first()
+                component = ComponentName.query.filter_by(project_id=project_id, category=category, category_index=category_index).first()
                 if component:
                     component.name = name
                 else:
-                    component = ComponentName(category=category, category_index=category_index, name=name)
+                    component = ComponentName(project_id=project_id, category=category, category_index=category_index, name=name)
                     db.session.add(component)
                 db.session.commit()
                 flash('Name erfolgreich gespeichert!', 'success')
@@ -378,14 +1268,14 @@ def fragen():
         
         return redirect(url_for('fragen', _anchor=anchor))
 
-    project_config = session.get('project_config', {})
+    project_config = get_project_config()
     if 'sasil_abgaenge_counts' not in project_config:
         project_config['sasil_abgaenge_counts'] = {}
 
-    questions_db = QuestionAnswer.query.order_by(
+    questions_db = QuestionAnswer.query.filter_by(project_id=project_id).order_by(
         QuestionAnswer.category,
         QuestionAnswer.category_index,
-        QuestionAnswer.sasil_abgang_index.nullslast(),
+        QuestionAnswer.sasil_abgang_index,
         QuestionAnswer.sort_index
     ).all()
 
@@ -395,9 +1285,17 @@ def fragen():
         if key not in grouped_questions: grouped_questions[key] = []
         grouped_questions[key].append(q)
 
-    component_names = { (c.category, c.category_index): c.name for c in ComponentName.query.all() }
+    component_names = { (c.category, c.category_index): c.name for c in ComponentName.query.filter_by(project_id=project_id) }
+    projects = Project.query.order_by(Project.updated_at.desc()).all()
 
-    return render_template('fragen.html', project_config=project_config, grouped_questions=grouped_questions, component_names=component_names)
+    jobs = Job.query.filter_by(project_id=project_id).order_by(Job.created_at.desc()).limit(10).all()
+    filter_reports = {}
+    for report_id, job_id, label in db.session.query(FilterReport.id, FilterReport.job_id, FilterReport.label).filter(FilterReport.job_id.in_([job.id for job in jobs])):
+        filter_reports.setdefault(job_id, []).append((report_id, label))
+
+    return render_template('fragen.html', project_config=project_config, grouped_questions=grouped_questions, component_names=component_names,
+                           project=current_project(), projects=projects, jobs=jobs, job_kinds=JOB_KINDS,
+                           preview_categories=list(FILTER_CATEGORY_CONFIGS), filter_reports=filter_reports)
 
 
 @app.route('/synchronize_questions', methods=['POST'])
@@ -408,7 +1306,9 @@ def synchronize_questions():
         source_sasil_abgang_index_str = request.form.get('source_sasil_abgang_index')
         source_sasil_abgang_index = int(source_sasil_abgang_index_str) if source_sasil_abgang_index_str else None
 
+        project_id = current_project_id()
         source_questions = QuestionAnswer.query.filter_by(
+            project_id=project_id,
             category=source_category,
             category_index=source_category_index,
             sasil_abgang_index=source_sasil_abgang_index
@@ -418,15 +1318,14 @@ def synchronize_questions():
             flash('Keine Fragen in der Quelle zum Synchronisieren gefunden.', 'warning')
             return redirect(url_for('fragen'))
 
-        project_config = session.get('project_config', {})
+        project_config = get_project_config()
         target_categories_map = {
             'Trafo': 'num_trafos',
             'Einspeisung': 'num_einspeisungen',
             'Abgang': 'num_abgaenge',
             'SASIL': 'num_sasil'
         }
-        questions_added_count = 0
-
+        candidates = []
         for cat, num_key in target_categories_map.items():
             num_instances = project_config.get(num_key, 0)
 
@@ -437,31 +1336,13 @@ def synchronize_questions():
                     for j in range(1, num_abgaenge_sasil + 1):
                         if cat == source_category and i == source_category_index and j == source_sasil_abgang_index:
                             continue
-
-                        for q in source_questions:
-                            exists = QuestionAnswer.query.filter_by(
-                                category=cat, category_index=i, sasil_abgang_index=j, question=q.question
-                            ).first()
-                            if not exists:
-                                db.session.add(QuestionAnswer(
-                                    category=cat, category_index=i, sasil_abgang_index=j,
-                                    question=q.question, options=q.options, sort_index=q.sort_index
-                                ))
-                                questions_added_count += 1
+                        candidates.extend(question_instance(q, cat, i, j) for q in source_questions)
                 else:
                     if cat == source_category and i == source_category_index and source_sasil_abgang_index is None:
                         continue
+                    candidates.extend(question_instance(q, cat, i, None) for q in source_questions)
 
-                    for q in source_questions:
-                        exists = QuestionAnswer.query.filter_by(
-                            category=cat, category_index=i, sasil_abgang_index=None, question=q.question
-                        ).first()
-                        if not exists:
-                            db.session.add(QuestionAnswer(
-                                category=cat, category_index=i,
-                                question=q.question, options=q.options, sort_index=q.sort_index
-                            ))
-                            questions_added_count += 1
+        questions_added_count = provision_questions(project_id, candidates)
 
         db.session.commit()
         if questions_added_count > 0:
@@ -486,22 +1367,20 @@ def configure_sasil_abgaenge():
         sasil_index = int(sasil_index_str)
         new_abgaenge_count = int(request.form.get('num_abgaenge'))
 
-        project_config = session.get('project_config', {})
+        project_config = get_project_config()
+        project_id = current_project_id()
         sasil_counts = project_config.get('sasil_abgaenge_counts', {})
         old_abgaenge_count = sasil_counts.get(sasil_index_str, 0)
 
         if new_abgaenge_count > old_abgaenge_count:
-            master_questions = QuestionAnswer.query.filter_by(category='SASIL', category_index=sasil_index, sasil_abgang_index=1).all()
-            for i in range(old_abgaenge_count + 1, new_abgaenge_count + 1):
-                for master_q in master_questions:
-                    if not QuestionAnswer.query.filter_by(category='SASIL', category_index=sasil_index, sasil_abgang_index=i, question=master_q.question).first():
-                        db.session.add(QuestionAnswer(
-                            category='SASIL', category_index=sasil_index, sasil_abgang_index=i,
-                            question=master_q.question, options=master_q.options, sort_index=master_q.sort_index
-                        ))
+            master_questions = QuestionAnswer.query.filter_by(project_id=project_id, category='SASIL', category_index=sasil_index, sasil_abgang_index=1).all()
+            provision_questions(project_id, (question_instance(master_q, 'SASIL', sasil_index, i)
+                                for i in range(old_abgaenge_count + 1, new_abgaenge_count + 1)
+                                for master_q in master_questions))
         elif new_abgaenge_count < old_abgaenge_count:
             QuestionAnswer.query.filter(
                 and_(
+                    QuestionAnswer.project_id == project_id,
                     QuestionAnswer.category == 'SASIL',
                     QuestionAnswer.category_index == sasil_index,
                     QuestionAnswer.sasil_abgang_index > new_abgaenge_count
@@ -509,7 +1388,7 @@ def configure_sasil_abgaenge():
             ).delete(synchronize_session=False)
 
         project_config['sasil_abgaenge_counts'][sasil_index_str] = new_abgaenge_count
-        session['project_config'] = project_config
+        save_project_config(project_config)
 
         db.session.commit()
         flash(f'Anzahl der Abgänge für SASIL {sasil_index} wurde auf {new_abgaenge_count} aktualisiert.', 'success')
@@ -518,29 +1397,18 @@ def configure_sasil_abgaenge():
         db.session.rollback()
         flash(f'Fehler bei der Konfiguration der SASIL-Abgänge: {e}', 'error')
 
-    return redirect(url_for('fragen', _anchor=f"SASIL-{request.form.get('sasil_index')}-1", **session.get('project_config', {})))
+    return redirect(url_for('fragen', _anchor=f"SASIL-{request.form.get('sasil_index')}-1"))
 
 
 @app.route('/copy_sasil_answers', methods=['POST'])
 def copy_sasil_answers():
     try:
         sasil_index = int(request.form.get('sasil_index'))
-        project_config = session.get('project_config', {})
+        project_config = get_project_config()
         sasil_counts = project_config.get('sasil_abgaenge_counts', {})
         num_abgaenge_sasil = sasil_counts.get(str(sasil_index), 0)
 
-        source_answers = QuestionAnswer.query.filter_by(category='SASIL', category_index=sasil_index, sasil_abgang_index=1).all()
-
-        for i in range(2, num_abgaenge_sasil + 1):
-            for source_answer in source_answers:
-                target_question = QuestionAnswer.query.filter_by(
-                    category='SASIL',
-                    category_index=sasil_index,
-                    sasil_abgang_index=i,
-                    question=source_answer.question
-                ).first()
-                if target_question:
-                    target_question.answer = source_answer.answer
+        copy_first_abgang_answers(current_project_id(), sasil_index, num_abgaenge_sasil)
 
         db.session.commit()
         flash(f'Antworten für SASIL {sasil_index} wurden erfolgreich auf alle Abgänge übertragen.', 'success')
@@ -548,20 +1416,28 @@ def copy_sasil_answers():
         db.session.rollback()
         flash(f'Fehler beim Kopieren der Antworten: {e}', 'error')
 
-    return redirect(url_for('fragen', _anchor=f"SASIL-{request.form.get('sasil_index')}-1", **session.get('project_config', {})))
+    return redirect(url_for('fragen', _anchor=f"SASIL-{request.form.get('sasil_index')}-1"))
+
+
+@app.route('/projekt/<int:project_id>')
+def open_project(project_id):
+    project = db.get_or_404(Project, project_id)
+    session['project_id'] = project.id
+    flash(f'Projekt "{project.name or project.id}" geöffnet.', 'info')
+    return redirect(url_for('fragen'))
 
 
 @app.route('/reset_fragen_config')
 def reset_fragen_config():
-    session.pop('project_config', None)
+    session.pop('project_id', None)
     flash('Konfiguration zurückgesetzt. Bitte neu einrichten.', 'info')
     return redirect(url_for('fragen'))
 
 @app.route('/delete_question/<int:question_id>', methods=['POST'])
 def delete_question(question_id):
-    q_ref = QuestionAnswer.query.get_or_404(question_id)
+    q_ref = QuestionAnswer.query.filter_by(id=question_id, project_id=current_project_id()).first_or_404()
     try:
-        QuestionAnswer.query.filter_by(question=q_ref.question, category=q_ref.category).delete()
+        QuestionAnswer.query.filter_by(project_id=q_ref.project_id, question=q_ref.question, category=q_ref.category).delete()
         db.session.commit()
         flash(f'Frage wurde aus allen "{q_ref.category}"-Reitern gelöscht.', 'success')
     except Exception as e:
@@ -570,18 +1446,18 @@ def delete_question(question_id):
     anchor = f"{q_ref.category}-{q_ref.category_index}"
     if q_ref.category == 'SASIL':
         anchor += f"-{q_ref.sasil_abgang_index}"
-    return redirect(url_for('fragen', _anchor=anchor, **session.get('project_config', {})))
+    return redirect(url_for('fragen', _anchor=anchor))
 
 @app.route('/edit_question/<int:question_id>', methods=['POST'])
 def edit_question(question_id):
-    q_ref = QuestionAnswer.query.get_or_404(question_id)
+    q_ref = QuestionAnswer.query.filter_by(id=question_id, project_id=current_project_id()).first_or_404()
     try:
         new_text = request.form.get(f'edited_question_text_{question_id}', '').strip()
         new_options = request.form.get(f'edited_options_{question_id}', '').strip()
         if not new_text or not new_options:
             flash("Fragetext und Antwortmöglichkeiten dürfen nicht leer sein.", "error")
         else:
-            questions_to_update = QuestionAnswer.query.filter_by(question=q_ref.question, category=q_ref.category).all()
+            questions_to_update = QuestionAnswer.query.filter_by(project_id=q_ref.project_id, question=q_ref.question, category=q_ref.category).all()
             for q in questions_to_update:
                 q.question, q.options = new_text, new_options
             db.session.commit()
@@ -592,14 +1468,14 @@ def edit_question(question_id):
     anchor = f"{q_ref.category}-{q_ref.category_index}"
     if q_ref.category == 'SASIL':
         anchor += f"-{q_ref.sasil_abgang_index}"
-    return redirect(url_for('fragen', _anchor=anchor, **session.get('project_config', {})))
+    return redirect(url_for('fragen', _anchor=anchor))
 
 
 @app.route('/update_index/<int:question_id>', methods=['POST'])
 def update_index(question_id):
     try:
-        if q_ref := QuestionAnswer.query.get(question_id):
-            for q in QuestionAnswer.query.filter_by(question=q_ref.question, category=q_ref.category).all():
+        if q_ref := QuestionAnswer.query.filter_by(id=question_id, project_id=current_project_id()).first():
+            for q in QuestionAnswer.query.filter_by(project_id=q_ref.project_id, question=q_ref.question, category=q_ref.category).all():
                 q.sort_index = int(request.form.get('index', 99))
             db.session.commit()
             return jsonify({'success': True})
@@ -609,138 +1485,201 @@ def update_index(question_id):
     return jsonify({'success': False, 'message': 'Frage nicht gefunden.'})
 
 
-def generate_filtered_solutions_pdf(bearbeiter):
-    try:
-        project_config = session.get('project_config', {})
-
-        category_config_keys = {
-            'Trafo': 'num_trafos',
-            'Einspeisung': 'num_einspeisungen',
-            'Abgang': 'num_abgaenge',
-            'SASIL': 'num_sasil',
-        }
-
-        category_configs = {
-            'Trafo': {'sheet_name': 'Filter_Trafo', 'header_row': 14, 'data_start_row': 15, 'solution_start_col': 26},
-            'Einspeisung': {'sheet_name': 'Filter_Einspeisung', 'header_row': 14, 'data_start_row': 15, 'solution_start_col': 26},
-            'Abgang': {'sheet_name': 'Filter_Abgang', 'header_row': 14, 'data_start_row': 15, 'solution_start_col': 26},
-            'SASIL': {'sheet_name': 'Filter_Sasil', 'header_row': 14, 'data_start_row': 15, 'solution_start_col': 26}
-        }
-
-        pdf = FPDF(orientation='P', unit='mm', format='A4')
-        create_pdf_cover(pdf, bearbeiter, "Gefilterte Lösungen")
-        found_any_solution = False
-        diagnostics = []
-        pdf.add_page()
-        component_names = { (c.category, c.category_index): c.name for c in ComponentName.query.all() }
-
-        for category, config in category_configs.items():
-            num_components = project_config.get(category_config_keys.get(category), 0)
-            if num_components == 0: continue
-
-            try:
-                df_sheet = pd.read_excel('Daten.xlsx', sheet_name=config['sheet_name'], header=None)
-            except ValueError:
-                diagnostics.append(f"FEHLER: Das Tabellenblatt '{config['sheet_name']}' wurde in 'Daten.xlsx' nicht gefunden.")
-                continue
-
-            header_series = df_sheet.iloc[config['header_row']]
-            df_category_data = df_sheet.iloc[config['data_start_row']:].copy()
-            df_category_data.columns = [str(h).strip() if pd.notna(h) else '' for h in header_series]
-
-            for i in range(1, num_components + 1):
-                sasil_counts = project_config.get('sasil_abgaenge_counts', {})
-                num_abgaenge_loop = sasil_counts.get(str(i), 1) if category == 'SASIL' else 1
-
-                for j in range(1, num_abgaenge_loop + 1):
-                    component_name_from_db = component_names.get((category, i))
-                    component_name = f"{category} {i}"
-                    if component_name_from_db:
-                        component_name += f" - {component_name_from_db}"
-                    if category == 'SASIL': component_name += f" Abgang {j}"
-
-                    df_to_filter = df_category_data.copy()
-
-                    query_filter = {'category': category, 'category_index': i}
-                    if category == 'SASIL': query_filter['sasil_abgang_index'] = j
-
-                    answers = QuestionAnswer.query.filter_by(**query_filter).filter(
-                        QuestionAnswer.answer.isnot(None),
-                        QuestionAnswer.answer != '',
-                        QuestionAnswer.answer != 'nicht Relevant'
-                    ).all()
-
-                    if not answers:
-                        diagnostics.append(f"Für '{component_name}' wurden keine relevanten Antworten gefunden.")
-                        continue
-
-                    diagnostics.append(f"Für '{component_name}' wurden {len(answers)} Antworten gefunden. Beginne Filterung.")
-
-                    for answer_obj in answers:
-                        question_text, user_answer = answer_obj.question.strip(), answer_obj.answer.strip()
-                        if question_text not in df_to_filter.columns: continue
-
-                        if question_text == "Spannungsversorgung des Messgerätes?":
-                            match = re.search(r'(\d+)\s*v?\s*(ac|dc|ac/dc)?', user_answer.lower())
-                            if not match: continue
-                            user_voltage, user_type = int(match.group(1)), (match.group(2) or "ac/dc").upper()
-                            def check_voltage(cell):
-                                return pd.notna(cell) and any(s['min_v'] <= user_voltage <= s['max_v'] and user_type in s['type'] for s in parse_voltage_string(str(cell)))
-                            condition = df_to_filter[question_text].apply(check_voltage) | df_to_filter[question_text].isna()
-                        elif question_text == "Bis zur wie vielten Oberschwingung soll gemessen werden?":
-                            nums = re.findall(r'(\d+)', user_answer)
-                            if not nums: continue
-                            user_max_h = max(int(n) for n in nums)
-                            def check_harmonic(cell):
-                                cell_nums = re.findall(r'(\d+)', str(cell))
-                                return pd.notna(cell) and cell_nums and max(int(n) for n in cell_nums) >= user_max_h
-                            condition = df_to_filter[question_text].apply(check_harmonic) | df_to_filter[question_text].isna()
-                        else:
-                            condition = df_to_filter[question_text].astype(str).str.contains(user_answer, na=True, case=False, regex=False)
-
-                        df_to_filter = df_to_filter[condition]
-
-                    final_solutions = df_to_filter.iloc[:, config['solution_start_col']:].dropna(how='all', axis=1).dropna(how='all', axis=0)
-
-                    if not final_solutions.empty:
-                        diagnostics.append(f"Erfolgreich! Für '{component_name}' wurden {len(final_solutions)} Lösungen gefunden.")
-                        found_any_solution = True
-
-                        if pdf.get_y() + (len(final_solutions) + 2) * 10 > (pdf.h - pdf.b_margin): pdf.add_page()
-
-                        pdf.set_font("Arial", 'B', 14); pdf.cell(0, 10, txt=f"Lösungen für {component_name}", ln=True, align='L')
-                        pdf.set_font("Arial", 'B', 10)
-
-                        col_widths = [(pdf.w - 20) / len(final_solutions.columns)] * len(final_solutions.columns)
-                        for k, col_header in enumerate(final_solutions.columns): pdf.cell(col_widths[k], 10, str(col_header), 1, 0, 'C')
+# --- Filter-Protokoll ---
+class FilterTrace:
+    """Strukturiertes Protokoll einer Lösungsfilterung.
+
+    Je Komponente: Anzahl Antworten, Katalogzeilen mit Lösung vorher/nachher, Lösungen, Dauer und die einzelnen
+    Filterschritte (siehe CatalogSheet.filter_rows()). Fehlende Tabellenblätter werden als Eintrag mit 'error' vermerkt.
+    """
+    def __init__(self, components=None):
+        self.components = components if components is not None else []
+
+    def error(self, category, text):
+        self.components.append({'name': category, 'category': category, 'error': text})
+
+    def component(self, name, category, category_index, sasil_abgang_index, answers):
+        entry = {'name': name, 'category': category, 'category_index': category_index, 'sasil_abgang_index': sasil_abgang_index,
+                 'answers': len(answers), 'rows_total': None, 'rows_after': None, 'solutions': None, 'elapsed_ms': None,
+                 'reused_from': None, 'steps': []}
+        self.components.append(entry)
+        return entry
+
+    def diagnostics(self):
+        """Die Diagnosezeilen im bisherigen Textformat."""
+        lines = []
+        for c in self.components:
+            if c.get('error'):
+                lines.append(c['error'])
+            elif not c['answers']:
+                lines.append(f"Für '{c['name']}' wurden keine relevanten Antworten gefunden.")
+            else:
+                lines.append(f"Für '{c['name']}' wurden {c['answers']} Antworten gefunden. Beginne Filterung.")
+                if c['solutions']: lines.append(f"Erfolgreich! Für '{c['name']}' wurden {c['solutions']} Lösungen gefunden.")
+                else: lines.append(f"Keine passenden Lösungen für '{c['name']}' gefunden.")
+        return lines
+
+    def summary(self):
+        errors = [c for c in self.components if c.get('error')]
+        filtered = [c for c in self.components if not c.get('error') and c['answers']]
+        text = (f"Filter-Protokoll: {len(filtered)} Komponenten gefiltert, {sum(1 for c in filtered if c['solutions'])} mit Lösungen, "
+                f"{len(self.components) - len(filtered) - len(errors)} ohne Antworten.")
+        return text + ''.join(f" {c['error']}" for c in errors)
+
+    def question_summary(self):
+        """Aggregiert die Filterschritte je Frage (übernommene Antwortsätze zählen nicht doppelt), teuerste zuerst."""
+        questions = {}
+        for c in self.components:
+            if c.get('error') or c['reused_from']: continue
+            for step in c['steps']:
+                q = questions.setdefault((c['category'], step['question']), {
+                    'category': c['category'], 'question': step['question'], 'predicate': step['predicate'],
+                    'evaluations': 0, 'elapsed_ms': 0.0, 'rows_removed': 0, 'eliminated_all': 0})
+                q['evaluations'] += 1
+                q['elapsed_ms'] = round(q['elapsed_ms'] + step['elapsed_ms'], 3)
+                q['rows_removed'] += step['rows_before'] - step['rows_after']
+                if step['rows_before'] and not step['rows_after']: q['eliminated_all'] += 1
+        return sorted(questions.values(), key=lambda q: (-q['elapsed_ms'], -q['eliminated_all']))
+
+    def to_dict(self):
+        return {'summary': self.summary(), 'components': self.components,
+                'questions': self.question_summary(), 'diagnostics': self.diagnostics()}
+
+def store_filter_report(trace, label, project_id, job_id=None):
+    """Legt das Protokoll in fragen.db an; festgeschrieben wird es mit dem Abschluss des Auftrags."""
+    report = FilterReport(id=uuid.uuid4().hex, job_id=job_id, project_id=project_id, label=label,
+                          data={'components': trace.components})
+    db.session.add(report)
+    return report
+
+def build_solutions_pdf(project_id, bearbeiter, job_id=None):
+    """Filtert den Katalog mit den Antworten des Projekts und liefert (PDF-Bytes oder None, Meldungen).
+
+    Das Filter-Protokoll wird als FilterReport zum Auftrag job_id abgelegt; die Meldung enthält nur die Zusammenfassung.
+    """
+    from fpdf import FPDF
+    pdf = FPDF(orientation='P', unit='mm', format='A4')
+    create_pdf_cover(pdf, bearbeiter, "Gefilterte Lösungen")
+    pdf.add_page()
+    found_any_solution, trace = draw_project_solutions(pdf, project_id)
+    store_filter_report(trace, "Gefilterte Lösungen", project_id, job_id)
+
+    messages = [('info', trace.summary())]
+
+    if not found_any_solution:
+        messages.append(('warning', "Insgesamt wurden keine passenden Lösungen gefunden."))
+        return None, messages
+
+    return pdf.output(dest='S').encode('latin1'), messages
+
+def draw_project_solutions(pdf, project_id):
+    """Zeichnet die gefilterten Lösungen eines Projekts in pdf und liefert (Lösungen gefunden, FilterTrace)."""
+    import pandas as pd
+    project_config = project_config_for(project_id)
+
+    category_config_keys = {
+        'Trafo': 'num_trafos',
+        'Einspeisung': 'num_einspeisungen',
+        'Abgang': 'num_abgaenge',
+        'SASIL': 'num_sasil',
+    }
+
+    found_any_solution = False
+    trace = FilterTrace()
+    component_names = { (c.category, c.category_index): c.name for c in ComponentName.query.filter_by(project_id=project_id) }
+
+    filter_catalog = load_filter_catalog()
+    active_categories = [category for category in FILTER_CATEGORY_CONFIGS if project_config.get(category_config_keys.get(category), 0)]
+    component_answers = load_component_answers(project_id, active_categories)
+    # Identische Antwortsätze (z.B. nach "Antworten von Abgang 1 übernehmen") werden nur einmal gefiltert
+    solutions_by_answer_set = {}
+
+    for category, config in FILTER_CATEGORY_CONFIGS.items():
+        num_components = project_config.get(category_config_keys.get(category), 0)
+        if num_components == 0: continue
+
+        catalog_sheet = filter_catalog.get(category)
+        if catalog_sheet is None:
+            trace.error(category, f"FEHLER: Das Tabellenblatt '{config['sheet_name']}' wurde in 'Daten.xlsx' nicht gefunden.")
+            continue
+
+        for i in range(1, num_components + 1):
+            sasil_counts = project_config.get('sasil_abgaenge_counts', {})
+            num_abgaenge_loop = sasil_counts.get(str(i), 1) if category == 'SASIL' else 1
+
+            for j in range(1, num_abgaenge_loop + 1):
+                component_name_from_db = component_names.get((category, i))
+                component_name = f"{category} {i}"
+                if component_name_from_db:
+                    component_name += f" - {component_name_from_db}"
+                if category == 'SASIL': component_name += f" Abgang {j}"
+
+                answers = component_answers.get((category, i, j if category == 'SASIL' else None), [])
+                entry = trace.component(component_name, category, i, j if category == 'SASIL' else None, answers)
+                if not answers: continue
+
+                answer_set = (category, frozenset(answers))
+                if answer_set not in solutions_by_answer_set:
+                    started = perf_counter()
+                    rows = catalog_sheet.filter_rows(answers, trace=entry['steps'])
+                    solutions_by_answer_set[answer_set] = (catalog_sheet.solutions(rows), entry)
+                    entry.update(rows_total=catalog_sheet.row_count, rows_after=len(rows), elapsed_ms=round((perf_counter() - started) * 1000, 3))
+                final_solutions, first_entry = solutions_by_answer_set[answer_set]
+                if first_entry is not entry:
+                    entry.update(rows_total=first_entry['rows_total'], rows_after=first_entry['rows_after'], elapsed_ms=0.0,
+                                 reused_from=first_entry['name'], steps=first_entry['steps'])
+                entry['solutions'] = len(final_solutions)
+
+                if not final_solutions.empty:
+                    found_any_solution = True
+
+                    if pdf.get_y() + (len(final_solutions) + 2) * 10 > (pdf.h - pdf.b_margin): pdf.add_page()
+
+                    pdf.set_font("Arial", 'B', 14); pdf.cell(0, 10, txt=f"Lösungen für {component_name}", ln=True, align='L')
+                    pdf.set_font("Arial", 'B', 10)
+
+                    col_widths = [(pdf.w - 20) / len(final_solutions.columns)] * len(final_solutions.columns)
+                    for k, col_header in enumerate(final_solutions.columns): pdf.cell(col_widths[k], 10, str(col_header), 1, 0, 'C')
+                    pdf.ln()
+
+                    pdf.set_font("Arial", '', 9)
+                    for _, row in final_solutions.iterrows():
+                        for k, item in enumerate(row): pdf.cell(col_widths[k], 10, str(item) if pd.notna(item) else "", 1, 0, 'L')
                         pdf.ln()
 
-                        pdf.set_font("Arial", '', 9)
-                        for _, row in final_solutions.iterrows():
-                            for k, item in enumerate(row): pdf.cell(col_widths[k], 10, str(item) if pd.notna(item) else "", 1, 0, 'L')
-                            pdf.ln()
-                    else:
-                        diagnostics.append(f"Keine passenden Lösungen für '{component_name}' gefunden.")
-
-        flash("Diagnose-Bericht: \n" + "\n".join(diagnostics), "info")
-
-        if not found_any_solution:
-            flash("Insgesamt wurden keine passenden Lösungen gefunden.", "warning")
-            return redirect(url_for('fragen', **session.get('project_config', {})))
-
-        pdf_output = pdf.output(dest='S').encode('latin1')
-        return send_file(BytesIO(pdf_output), as_attachment=True, download_name='Gefilterte_Loesungen.pdf', mimetype='application/pdf')
-
-    except Exception as e:
-        print(f"Ein Fehler ist aufgetreten: {e}")
-        flash(f"Ein Fehler ist beim Erstellen des Lösungs-PDFs aufgetreten: {e}", "error")
-        return redirect(url_for('fragen', **session.get('project_config', {})))
+    return found_any_solution, trace
 
 
 @app.route('/download_filtered_pdf', methods=['POST'])
 def download_filtered_pdf():
     bearbeiter = request.form.get('bearbeiter', 'N/A')
-    return generate_filtered_solutions_pdf(bearbeiter)
+    return job_enqueued_response(enqueue_job('solutions_pdf', {'bearbeiter': bearbeiter}))
+
+
+@app.route('/api/loesungsvorschau', methods=['POST'])
+def solution_preview_api():
+    """Erwartet {category, category_index, sasil_abgang_index, answers: {Frage-ID: Antwort}} mit dem aktuellen Formularstand."""
+    project_id = current_project_id()
+    payload = request.get_json(silent=True) or {}
+    try:
+        category = payload['category']
+        category_index = int(payload['category_index'])
+        sasil_abgang_index = int(payload['sasil_abgang_index']) if category == 'SASIL' else None
+        form_answers = {int(question_id): str(answer) for question_id, answer in (payload.get('answers') or {}).items() if answer is not None}
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Ungültige Anfrage.'}), 400
+    if project_id is None or category not in FILTER_CATEGORY_CONFIGS:
+        return jsonify({'error': 'Für diese Komponente gibt es keine Lösungsvorschau.'}), 404
+
+    started = perf_counter()
+    questions = db.session.query(QuestionAnswer.id, QuestionAnswer.question).filter_by(
+        project_id=project_id, category=category, category_index=category_index, sasil_abgang_index=sasil_abgang_index)
+    preview = solution_preview(project_id, category, category_index, sasil_abgang_index,
+                               [(question, form_answers.get(question_id)) for question_id, question in questions])
+    if preview is None:
+        return jsonify({'error': f"Das Tabellenblatt '{FILTER_CATEGORY_CONFIGS[category]['sheet_name']}' wurde in 'Daten.xlsx' nicht gefunden."}), 404
+    preview['elapsed_ms'] = round((perf_counter() - started) * 1000, 2)
+    return jsonify(preview)
 
 
 @app.route('/import_answers_pdf', methods=['POST'])
@@ -755,248 +1694,730 @@ def import_answers_pdf():
         flash('Bitte wählen Sie eine gültige PDF-Datei aus.', 'error')
         return redirect(url_for('fragen'))
 
+    if not get_project_config():
+        flash('Keine Projektkonfiguration gefunden.', 'error')
+        return redirect(url_for('fragen'))
+    job_id, input_dir = new_job_input_dir()
+    file.save(os.path.join(input_dir, 'answers.pdf'))
+    return job_enqueued_response(enqueue_job('import_answers', {'bearbeiter': bearbeiter}, job_id=job_id))
+
+@app.route('/import_answers_pdf_batch', methods=['POST'])
+def import_answers_pdf_batch():
+    bearbeiter = request.form.get('bearbeiter_batch', 'N/A')
+    files = [file for file in request.files.getlist('answers_pdfs') if file.filename]
+    if not files:
+        flash('Keine Dateien hochgeladen.', 'error')
+        return redirect(url_for('fragen'))
+    job_id, input_dir = new_job_input_dir()
     try:
-        project_config = session.get('project_config', {})
-        if not project_config:
-            flash('Keine Projektkonfiguration in der Session gefunden.', 'error')
-            return redirect(url_for('fragen'))
-
-        # Bestehende Antworten für das Projekt zurücksetzen
-        conditions_to_reset = [QuestionAnswer.category == 'Allgemein']
-        if project_config.get('num_trafos', 0) > 0: conditions_to_reset.append(QuestionAnswer.category == 'Trafo')
-        if project_config.get('num_einspeisungen', 0) > 0: conditions_to_reset.append(QuestionAnswer.category == 'Einspeisung')
-        if project_config.get('num_abgaenge', 0) > 0: conditions_to_reset.append(QuestionAnswer.category == 'Abgang')
-        if project_config.get('num_sasil', 0) > 0: conditions_to_reset.append(QuestionAnswer.category == 'SASIL')
-        QuestionAnswer.query.filter(or_(*conditions_to_reset)).update({QuestionAnswer.answer: None}, synchronize_session=False)
-
-        reader = PdfReader(file.stream)
-        if not (fields := reader.get_fields()):
-            flash('Die PDF enthält keine ausfüllbaren Felder.', 'warning')
-            return redirect(url_for('fragen'))
-
-        updated_count = 0
-        sasil_to_sync = set() # Speichert die Indizes der zu synchronisierenden SASILs
-
-        # 1. Durchlaufe alle Felder aus dem PDF
-        for name, data in fields.items():
-            value = data.get("/V")
-
-            # Reguläre Antworten importieren
-            if name.startswith('question_') and value and str(value).strip():
-                # Der Name kann jetzt z.B. 'question_123_abgang_1' sein
-                parts = name.split('_')
-                q_id = int(parts[1])
-
-                # Konvertiere den PDF-Wert in einen speicherbaren String
-                # /Off ist der Wert für eine nicht angekreuzte Box, /Yes (oder ein anderer Name) für eine angekreuzte
-                answer_val = str(value)
-                if answer_val.startswith('/'):
-                    answer_val = answer_val[1:] # Entferne das '/'
-
-                answer = 'nicht Relevant' if answer_val.lower() == 'nein' else answer_val
-
-                QuestionAnswer.query.filter_by(id=q_id).update({QuestionAnswer.answer: answer})
-                updated_count += 1
-
-            # Prüfe, ob es sich um eine Sync-Checkbox handelt und ob sie angekreuzt ist
-            if name.startswith('sync_sasil_') and value and value != '/Off':
-                sasil_index = int(name.split('_')[-1])
-                sasil_to_sync.add(sasil_index)
-
-        # 2. Führe die Synchronisierung für die markierten SASILs durch
-        if sasil_to_sync:
-            flash(f"Synchronisierung für SASIL-Felder {list(sasil_to_sync)} wird durchgeführt.", "info")
-            for sasil_index in sasil_to_sync:
-                # Hole alle Antworten von Abgang 1 für dieses SASIL-Feld
-                source_answers = QuestionAnswer.query.filter_by(
-                    category='SASIL',
-                    category_index=sasil_index,
-                    sasil_abgang_index=1
-                ).all()
-
-                sasil_counts = project_config.get('sasil_abgaenge_counts', {})
-                num_abgaenge = sasil_counts.get(str(sasil_index), 1)
-
-                # Kopiere die Antworten auf alle anderen Abgänge (2, 3, ...)
-                for i in range(2, num_abgaenge + 1):
-                    for source_q in source_answers:
-                        # Finde die Zielfrage und update sie
-                        QuestionAnswer.query.filter_by(
-                            category='SASIL',
-                            category_index=sasil_index,
-                            sasil_abgang_index=i,
-                            question=source_q.question # Finde die Frage mit demselben Text
-                        ).update({QuestionAnswer.answer: source_q.answer})
-
-        db.session.commit()
-        flash(f'{updated_count} Antworten wurden aus der PDF importiert!', 'success')
-        # Nach dem Import direkt die Lösungs-PDF generieren und herunterladen
-        return generate_filtered_solutions_pdf(bearbeiter)
-
+        names = save_batch_import_files(files, input_dir)
+        if not names:
+            raise ValueError('Es wurden keine PDF-Dateien gefunden (erlaubt sind PDFs und ZIP-Archive mit PDFs).')
+    except (ValueError, zipfile.BadZipFile) as e:
+        shutil.rmtree(input_dir, ignore_errors=True)
+        flash(f'Fehler beim Sammelimport: {e}', 'error')
+        return redirect(url_for('fragen'))
+    return job_enqueued_response(enqueue_job('import_answers_batch', {'bearbeiter': bearbeiter, 'files': names}, job_id=job_id))
+
+PDF_ANSWER_FIELD = re.compile(r'^question_(\d+)(?:_abgang_(\d+))?$')
+PDF_SYNC_FIELD = re.compile(r'^sync_sasil_(\d+)$')
+
+def iter_acroform_fields(reader):
+    """Liefert (voller Name, Wert) der Formularfelder direkt aus /AcroForm /Fields, ohne alle Seiten-Annotationen zu lesen."""
+    acroform = reader.trailer['/Root'].get('/AcroForm')
+    if acroform is None: return
+    stack = [(field, '', None) for field in reversed(acroform.get_object().get('/Fields', []))]
+    while stack:
+        ref, parent_name, parent_value = stack.pop()
+        field = ref.get_object()
+        partial = field.get('/T')
+        name = f"{parent_name}.{partial}" if parent_name and partial else str(partial or parent_name)
+        value = field.get('/V', parent_value)
+        if value is not None: value = value.get_object()
+        if '/Kids' in field:
+            stack.extend((kid, name, value) for kid in reversed(field['/Kids']))
+        else:
+            yield name, value
+
+def read_pdf_answers(pdf_file):
+    """Liest eine ausgefüllte Fragebogen-PDF in einem Durchgang über den Feldbaum.
+
+    Liefert ({Frage-ID: (Abgang, Antwort)}, {SASIL-Indizes, deren Abgänge synchronisiert werden},
+    IDs aller Fragefelder, auch der leeren). Benötigt keine Datenbank und kann daher auch in einem eigenen Prozess laufen.
+    """
+    from PyPDF2 import PdfReader
+    answers, sasil_to_sync, question_ids = {}, set(), set()
+    for name, value in iter_acroform_fields(PdfReader(pdf_file)):
+        if match := PDF_ANSWER_FIELD.match(name):
+            question_ids.add(int(match.group(1)))
+        if match and value and str(value).strip():
+            # /Off ist der Wert für eine nicht angekreuzte Box, /Yes (oder ein anderer Name) für eine angekreuzte
+            answer_val = str(value)
+            if answer_val.startswith('/'):
+                answer_val = answer_val[1:]
+            answer = 'nicht Relevant' if answer_val.lower() == 'nein' else answer_val
+            abgang = int(match.group(2)) if match.group(2) else None
+            answers[int(match.group(1))] = (abgang, answer)
+        elif (match := PDF_SYNC_FIELD.match(name)) and value and value != '/Off':
+            sasil_to_sync.add(int(match.group(1)))
+    return answers, sasil_to_sync, question_ids
+
+def read_pdf_answers_file(path):
+    """Worker für den Sammelimport (läuft im Prozess-Pool): (Ergebnis von read_pdf_answers, Sekunden, Fehlertext)."""
+    started = perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            return read_pdf_answers(f), perf_counter() - started, None
+    except Exception as e:
+        return None, perf_counter() - started, str(e)
+
+def project_for_question_ids(question_ids):
+    """Ermittelt das Projekt, zu dem alle Frage-IDs einer PDF gehören; None, wenn keines oder mehrere passen."""
+    question_ids, project_ids = list(question_ids), set()
+    for offset in range(0, len(question_ids), 500):
+        chunk = question_ids[offset:offset + 500]
+        project_ids.update(project_id for project_id, in db.session.query(QuestionAnswer.project_id).filter(QuestionAnswer.id.in_(chunk)).distinct())
+    return project_ids.pop() if len(project_ids) == 1 else None
+
+def import_answers_from_pdf(project_id, pdf_stream):
+    """Übernimmt die Formularfelder einer ausgefüllten Fragebogen-PDF. Liefert (Import erfolgt, Meldungen)."""
+    try:
+        started = perf_counter()
+        answers, sasil_to_sync, question_ids = read_pdf_answers(pdf_stream)
+        timings = [('PDF lesen', perf_counter() - started)]
+        if not question_ids:
+            return False, [('warning', 'Die PDF enthält keine ausfüllbaren Felder.')]
+        # Erst das zugehörige Projekt prüfen: das Zurücksetzen darf nie ein fremdes, geöffnetes Projekt treffen
+        owner_id = project_for_question_ids(question_ids)
+        if owner_id is None:
+            return False, [('error', 'Die Fragen der PDF gehören zu keinem oder zu mehreren Projekten. Es wurde nichts geändert.')]
+        if owner_id != project_id:
+            owner = db.session.get(Project, owner_id)
+            return False, [('error', f"Die PDF gehört zum Projekt '{owner.name or owner_id}', nicht zum geöffneten Projekt. "
+                                     "Bitte dieses Projekt öffnen und erneut importieren. Es wurde nichts geändert.")]
+        imported, messages = apply_pdf_answers(project_id, answers, sasil_to_sync, timings)
+        if imported:
+            db.session.commit()
+        return imported, messages
     except Exception as e:
         db.session.rollback()
-        flash(f'Fehler beim Einlesen der PDF: {e}', 'error')
-        import traceback
         traceback.print_exc()
-        return redirect(url_for('fragen', **session.get('project_config', {})))
+        return False, [('error', f'Fehler beim Einlesen der PDF: {e}')]
+
+def apply_pdf_answers(project_id, answers, sasil_to_sync, timings):
+    """Setzt die Antworten des Projekts zurück und schreibt die gelesenen Antworten per Bulk-UPDATE (ohne Commit)."""
+    messages = []
+    project_config = project_config_for(project_id)
+    if not project_config:
+        return False, [('error', 'Keine Projektkonfiguration gefunden.')]
+
+    started = perf_counter()
+    # Bestehende Antworten für das Projekt zurücksetzen
+    conditions_to_reset = [QuestionAnswer.category == 'Allgemein']
+    if project_config.get('num_trafos', 0) > 0: conditions_to_reset.append(QuestionAnswer.category == 'Trafo')
+    if project_config.get('num_einspeisungen', 0) > 0: conditions_to_reset.append(QuestionAnswer.category == 'Einspeisung')
+    if project_config.get('num_abgaenge', 0) > 0: conditions_to_reset.append(QuestionAnswer.category == 'Abgang')
+    if project_config.get('num_sasil', 0) > 0: conditions_to_reset.append(QuestionAnswer.category == 'SASIL')
+    QuestionAnswer.query.filter(QuestionAnswer.project_id == project_id, or_(*conditions_to_reset)).update({QuestionAnswer.answer: None}, synchronize_session=False)
+    updated = save_answers_bulk(project_id, {q_id: answer for q_id, (_, answer) in answers.items()})
+    timings.append(('Speichern', perf_counter() - started))
+
+    # Antworten von Abgang 1 auf alle anderen Abgänge der markierten SASILs kopieren
+    if sasil_to_sync:
+        started = perf_counter()
+        messages.append(('info', f"Synchronisierung für SASIL-Felder {sorted(sasil_to_sync)} wird durchgeführt."))
+        sasil_counts = project_config.get('sasil_abgaenge_counts', {})
+        for sasil_index in sasil_to_sync:
+            copy_first_abgang_answers(project_id, sasil_index, sasil_counts.get(str(sasil_index), 1))
+        timings.append(('Synchronisieren', perf_counter() - started))
+
+    messages.append(('success', f'{updated} Antworten wurden aus der PDF importiert!'))
+    if updated < len(answers):
+        messages.append(('warning', f'{len(answers) - updated} von {len(answers)} Antworten der PDF gehören zu keiner Frage des Projekts '
+                                    '(z.B. inzwischen gelöschte Fragen) und wurden nicht übernommen.'))
+    messages.append(('info', 'Importdauer: ' + ', '.join(f'{stage} {seconds * 1000:.0f} ms' for stage, seconds in timings)))
+    return True, messages
 
 @app.route('/export_questions_pdf', methods=['POST'])
 def export_questions_pdf():
-    # Wir benötigen diese speziellen Imports nicht mehr
-    # from reportlab.pdfbase.pdfdoc import PDFName, PDFString, PDFArray, PDFDictionary
-
-    try:
-        bearbeiter = request.form.get('bearbeiter', 'N/A')
-        kunde = request.form.get('kunde', 'N/A')
-        project_config = session.get('project_config', {})
-
-        # ... (Datenbankabfrage bleibt unverändert) ...
-        conditions = [QuestionAnswer.category == 'Allgemein']
-        if (n := project_config.get('num_trafos', 0)) > 0: conditions.append(QuestionAnswer.category == 'Trafo')
-        if (n := project_config.get('num_einspeisungen', 0)) > 0: conditions.append(QuestionAnswer.category == 'Einspeisung')
-        if (n := project_config.get('num_abgaenge', 0)) > 0: conditions.append(QuestionAnswer.category == 'Abgang')
-        if (n := project_config.get('num_sasil', 0)) > 0: conditions.append(QuestionAnswer.category == 'SASIL')
-
-        fragen_db = QuestionAnswer.query.filter(or_(*conditions)).order_by(
-            QuestionAnswer.category, QuestionAnswer.category_index,
-            QuestionAnswer.sasil_abgang_index.nullslast(), QuestionAnswer.sort_index
-        ).all()
-
-        if not fragen_db:
-            flash("Keine Fragen zum Exportieren vorhanden.", "info")
-            return redirect(url_for('fragen', **project_config))
-
-        buffer = io.BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4; c.acroForm; styles = getSampleStyleSheet()
-        style = styles["Normal"]; style.alignment = TA_LEFT; style.leading = 14
-
-        # ... (Deckblatt- und Header-Logik bleibt unverändert) ...
-        logo_path = os.path.join(basedir, 'static', 'img', 'logo.png')
+    params = {'bearbeiter': request.form.get('bearbeiter', 'N/A'), 'kunde': request.form.get('kunde', 'N/A'),
+              'template_mode': request.form.get('vorlagenmodus') == 'on'}
+    if not wants_json_response():
+        # Bereits erzeugte Fragebögen direkt als Datei ausliefern, ohne Auftrag
+        project_config, fragen_db, component_names = load_questionnaire(current_project_id())
+        if fragen_db:
+            cache_key = questionnaire_cache_key(project_config, fragen_db, component_names, params['bearbeiter'], params['kunde'], date.today(), params['template_mode'])
+            if (cached_path := questionnaire_pdf_cache.get(cache_key)) is not None:
+                return send_file(cached_path, as_attachment=True, download_name='Fragebogen_ausfuellbar.pdf', mimetype='application/pdf')
+    return job_enqueued_response(enqueue_job('questions_pdf', params))
+
+def load_questionnaire(project_id):
+    """Liefert (project_config, Fragen in Exportreihenfolge, Komponentennamen) für den Fragebogen-Export."""
+    project_config = project_config_for(project_id)
+
+    # ... (Datenbankabfrage bleibt unverändert) ...
+    conditions = [QuestionAnswer.category == 'Allgemein']
+    if (n := project_config.get('num_trafos', 0)) > 0: conditions.append(QuestionAnswer.category == 'Trafo')
+    if (n := project_config.get('num_einspeisungen', 0)) > 0: conditions.append(QuestionAnswer.category == 'Einspeisung')
+    if (n := project_config.get('num_abgaenge', 0)) > 0: conditions.append(QuestionAnswer.category == 'Abgang')
+    if (n := project_config.get('num_sasil', 0)) > 0: conditions.append(QuestionAnswer.category == 'SASIL')
+
+    fragen_db = QuestionAnswer.query.filter(QuestionAnswer.project_id == project_id, or_(*conditions)).order_by(
+        QuestionAnswer.category, QuestionAnswer.category_index,
+        QuestionAnswer.sasil_abgang_index, QuestionAnswer.sort_index
+    ).all()
+    component_names = { (c.category, c.category_index): c.name for c in ComponentName.query.filter_by(project_id=project_id) }
+    return project_config, fragen_db, component_names
+
+def questionnaire_cache_key(project_config, fragen_db, component_names, bearbeiter, kunde, export_date, template_mode=False):
+    """Hash über alle Eingaben, die in den Fragebogen einfließen (Antworten gehören nicht dazu)."""
+    payload = {
+        'layout': QUESTIONNAIRE_LAYOUT_VERSION,
+        'config': project_config,
+        'questions': [(q.id, q.category, q.category_index, q.sasil_abgang_index, q.question, q.options) for q in fragen_db],
+        'component_names': sorted([category, index, name] for (category, index), name in component_names.items()),
+        'bearbeiter': bearbeiter, 'kunde': kunde, 'date': export_date.isoformat(), 'template_mode': template_mode,
+        'logo': os.stat(QUESTIONNAIRE_LOGO).st_mtime_ns if os.path.exists(QUESTIONNAIRE_LOGO) else None,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def build_questions_pdf(project_id, bearbeiter, kunde, template_mode=False):
+    """Erstellt den ausfüllbaren Fragebogen (AcroForm) und liefert (PDF-Bytes oder None, Meldungen).
+
+    Identische Eingaben werden aus dem Datei-Cache bedient.
+    """
+    project_config, fragen_db, component_names = load_questionnaire(project_id)
+    if not fragen_db:
+        return None, [('info', "Keine Fragen zum Exportieren vorhanden.")]
+    export_date = date.today()
+    cache_key = questionnaire_cache_key(project_config, fragen_db, component_names, bearbeiter, kunde, export_date, template_mode)
+    if (cached_path := questionnaire_pdf_cache.get(cache_key)) is not None:
+        with open(cached_path, 'rb') as f:
+            return f.read(), []
+    pdf_output = render_questions_pdf(project_config, fragen_db, component_names, bearbeiter, kunde, export_date, template_mode=template_mode)
+    questionnaire_pdf_cache.put(cache_key, pdf_output)
+    return pdf_output, []
+
+class ParagraphLayoutCache:
+    """Umbrochene Paragraphen je (Text, Breite, Stil) für einen Export.
+
+    Dieselben Fragen wiederholen sich in jedem Trafo/Abgang/SASIL-Abgang; ein Paragraph wird nur einmal
+    gemessen und danach für jede Instanz erneut gezeichnet.
+    """
+    def __init__(self, style, enabled=True):
+        self.style, self.enabled = style, enabled
+        self._style_key = (style.name, style.fontName, style.fontSize, style.leading, style.alignment)
+        self._layouts = {}
+        self.hits = self.misses = 0
+
+    def layout(self, text, width, max_height):
+        """Liefert (Paragraph, Höhe) für text bei gegebener Spaltenbreite."""
+        from reportlab.platypus import Paragraph
+        key = (text, width, self._style_key)
+        if self.enabled and key in self._layouts:
+            self.hits += 1
+            return self._layouts[key]
+        self.misses += 1
+        paragraph = Paragraph(text, self.style)
+        self._layouts[key] = result = (paragraph, paragraph.wrap(width, max_height)[1])
+        return result
+
+@functools.lru_cache(maxsize=4096)
+def question_display_options(question, options):
+    """Antwortmöglichkeiten, wie sie im Fragebogen angezeigt werden."""
+    if "Oberschwingung" in question: return "1. - 63."
+    if "Spannungsversorgung" in question: return "SpannungV AC oder DC"
+    return options.replace(',', ', ') + (", Nein" if 'ja' in options.lower() and 'nein' not in options.lower() else "")
+
+def render_questions_pdf(project_config, fragen_db, component_names, bearbeiter, kunde, export_date, memoize_layout=True, template_mode=False):
+    """Zeichnet den ausfüllbaren Fragebogen.
+
+    Im Vorlagenmodus (template_mode) wird jede Tabelle mit identischen Fragen nur einmal als Form-XObject
+    gezeichnet und für jede Instanz (z.B. jeden SASIL-Abgang) gestempelt; je Instanz kommen nur Titel und
+    Formularfelder hinzu. Tabellen, die nicht auf eine Seite passen, werden wie bisher zeilenweise gezeichnet.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.enums import TA_LEFT
+    from reportlab.lib import colors
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4; c.acroForm; styles = getSampleStyleSheet()
+    style = styles["Normal"]; style.alignment = TA_LEFT; style.leading = 14
+    layouts = ParagraphLayoutCache(style, enabled=memoize_layout)
+
+    # ... (Deckblatt- und Header-Logik bleibt unverändert) ...
+    logo_path = QUESTIONNAIRE_LOGO
+    if os.path.exists(logo_path):
+        c.drawImage(logo_path, x=(width/2 - 63*mm), y=(height - 150*mm), width=355, preserveAspectRatio=True, mask='auto')
+    c.setFont("Helvetica-Bold", 24); c.drawCentredString(width/2, height - 150*mm, "Fragebogen zur ISO50001")
+    c.setFont("Helvetica", 12)
+    c.drawCentredString(width/2, height - 180*mm, f"Kunde: {kunde}")
+    c.drawCentredString(width/2, height - 200*mm, f"Bearbeiter: {bearbeiter}")
+    c.drawCentredString(width/2, height - 220*mm, f"Datum: {export_date.strftime('%d.%m.%Y')}")
+    c.showPage()
+
+    x_margin, col_widths = 18 * mm, [80 * mm, 55 * mm, 45 * mm]
+    def draw_page_header(canvas, pg_width, pg_height):
+        canvas.setFont("Helvetica-Bold", 18)
+        canvas.drawString(pg_width/2 - 30*mm, pg_height - 15*mm, 'ISO50001 Fragebogen')
         if os.path.exists(logo_path):
-            c.drawImage(logo_path, x=(width/2 - 63*mm), y=(height - 150*mm), width=355, preserveAspectRatio=True, mask='auto')
-        c.setFont("Helvetica-Bold", 24); c.drawCentredString(width/2, height - 150*mm, "Fragebogen zur ISO50001")
-        c.setFont("Helvetica", 12)
-        c.drawCentredString(width/2, height - 180*mm, f"Kunde: {kunde}")
-        c.drawCentredString(width/2, height - 200*mm, f"Bearbeiter: {bearbeiter}")
-        c.drawCentredString(width/2, height - 220*mm, f"Datum: {date.today().strftime('%d.%m.%Y')}")
-        c.showPage()
-
-        x_margin, col_widths = 18 * mm, [80 * mm, 55 * mm, 45 * mm]
-        def draw_page_header(canvas, pg_width, pg_height):
-            canvas.setFont("Helvetica-Bold", 18)
-            canvas.drawString(pg_width/2 - 30*mm, pg_height - 15*mm, 'ISO50001 Fragebogen')
-            if os.path.exists(logo_path):
-                canvas.drawImage(logo_path, x=160*mm, y=207*mm, width=105, preserveAspectRatio=True, mask='auto')
-        def draw_table_header(y_pos):
-            c.setFont("Helvetica-Bold", 10); header_h = 8*mm
-            c.drawString(x_margin + 2*mm, y_pos - (header_h/1.5), "Frage")
-            c.drawString(x_margin + col_widths[0] + 2*mm, y_pos - (header_h/1.5), "Antwortmöglichkeiten")
-            c.drawString(x_margin + sum(col_widths[:2]) + 2*mm, y_pos - (header_h/1.5), "Antwort")
-            c.grid([x_margin, x_margin + col_widths[0], x_margin + sum(col_widths[:2]), x_margin + sum(col_widths)], [y_pos, y_pos - header_h])
-            return y_pos - header_h
-
-        from itertools import groupby
-        keyfunc = lambda q: (q.category, q.category_index, q.sasil_abgang_index)
-        grouped_data = {k: list(v) for k, v in groupby(fragen_db, key=keyfunc)}
-        component_names = { (c.category, c.category_index): c.name for c in ComponentName.query.all() }
-        # KEIN JAVASCRIPT MEHR NÖTIG
-
-        draw_page_header(c, width, height)
-        y_cursor = height - 25 * mm
-
-        for category, cat_index, abgang_index in sorted(grouped_data.keys(), key=lambda k: (['Allgemein', 'Trafo', 'Einspeisung', 'Abgang', 'SASIL'].index(k[0]), k[1], k[2] or 0)):
-            questions = grouped_data.get((category, cat_index, abgang_index), [])
-            if not questions: continue
-            if y_cursor < 100 * mm:
-                c.showPage(); draw_page_header(c, width, height); y_cursor = height - 25*mm
-            component_name_from_db = component_names.get((category, cat_index))
-            title = category if category == 'Allgemein' else f'{category} {cat_index}'
-            if component_name_from_db:
-                title += f" - {component_name_from_db}"
-
-            if category == 'SASIL' and abgang_index == 1:
-                c.setFont("Helvetica-Bold", 14); c.drawString(x_margin, y_cursor, title); y_cursor -= 8*mm
-
-                sasil_counts = project_config.get('sasil_abgaenge_counts', {})
-                num_abgaenge = sasil_counts.get(str(cat_index), 1)
-
-                if num_abgaenge > 1:
-                    # Einfache Checkbox ohne Aktion. Der Name ist wichtig für den Import.
-                    c.acroForm.checkbox(
-                        name=f'sync_sasil_{cat_index}',
-                        x=x_margin,
-                        y=y_cursor - 4*mm,
-                        tooltip="Wenn angekreuzt, werden die Antworten von Abgang 1 für alle anderen Abgänge dieses Feldes übernommen."
-                    )
-
-                    c.setFont("Helvetica", 10)
-                    c.drawString(x_margin + 10*mm, y_cursor - 1.75*mm, "Alle Messinstrumente sind gleich zu wählen (Wenn diese Aktion ausgewählt ist bitte nur Abgang 1 ausfüllen)")
-                    y_cursor -= 10*mm
-
-            if category == 'SASIL':
-                title = f"Abgang {abgang_index}"
-
-            # ... (Rest der Funktion zum Zeichnen der Tabellen bleibt unverändert) ...
-            c.setFont("Helvetica-Bold", 12); c.drawString(x_margin, y_cursor, title); y_cursor -= 10*mm
+            canvas.drawImage(logo_path, x=160*mm, y=207*mm, width=105, preserveAspectRatio=True, mask='auto')
+    header_h = 8*mm
+    def draw_table_header(y_pos):
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(x_margin + 2*mm, y_pos - (header_h/1.5), "Frage")
+        c.drawString(x_margin + col_widths[0] + 2*mm, y_pos - (header_h/1.5), "Antwortmöglichkeiten")
+        c.drawString(x_margin + sum(col_widths[:2]) + 2*mm, y_pos - (header_h/1.5), "Antwort")
+        c.grid([x_margin, x_margin + col_widths[0], x_margin + sum(col_widths[:2]), x_margin + sum(col_widths)], [y_pos, y_pos - header_h])
+        return y_pos - header_h
+
+    from itertools import groupby
+    keyfunc = lambda q: (q.category, q.category_index, q.sasil_abgang_index)
+    grouped_data = {k: list(v) for k, v in groupby(fragen_db, key=keyfunc)}
+    # KEIN JAVASCRIPT MEHR NÖTIG
+
+    def layout_row(q):
+        q_p, q_h = layouts.layout(q.question, col_widths[0] - 4*mm, height)
+        o_p, o_h = layouts.layout(question_display_options(q.question, q.options), col_widths[1] - 4*mm, height)
+        return q, q_p, o_p, max(10 * mm, q_h + 4*mm, o_h + 4*mm)
+
+    def draw_row(q_p, o_p, row_h, y_pos):
+        q_p.drawOn(c, x_margin + 2*mm, y_pos - row_h + 2*mm)
+        o_p.drawOn(c, x_margin + col_widths[0] + 2*mm, y_pos - row_h + 2*mm)
+        c.grid([x_margin, x_margin + col_widths[0], x_margin + sum(col_widths[:2]), x_margin + sum(col_widths)], [y_pos, y_pos - row_h])
+
+    def add_answer_field(name, row_h, y_pos):
+        c.acroForm.textfield(name=name, x=x_margin + sum(col_widths[:2]) + 2*mm, y=y_pos - row_h + 2*mm, width=col_widths[2] - 4*mm, height=row_h - 4*mm, borderStyle='solid', borderWidth=1, borderColor=colors.black)
+
+    table_forms = {} # (Frage, Antwortmöglichkeiten) je Zeile -> Name des Form-XObjects
+    def table_form(rows, table_h):
+        key = tuple((q.question, q.options) for q, *_ in rows)
+        if key not in table_forms:
+            table_forms[key] = name = f'table{len(table_forms)}'
+            c.beginForm(name, lowerx=0, lowery=-1, upperx=width, uppery=table_h + 1) # 1 pt Rand, damit die äußeren Linien nicht beschnitten werden
+            y_pos = draw_table_header(table_h)
+            for _, q_p, o_p, row_h in rows:
+                draw_row(q_p, o_p, row_h, y_pos)
+                y_pos -= row_h
+            c.endForm()
+        return table_forms[key]
+
+    draw_page_header(c, width, height)
+    y_cursor = height - 25 * mm
+
+    for category, cat_index, abgang_index in sorted(grouped_data.keys(), key=lambda k: (['Allgemein', 'Trafo', 'Einspeisung', 'Abgang', 'SASIL'].index(k[0]), k[1], k[2] or 0)):
+        questions = grouped_data.get((category, cat_index, abgang_index), [])
+        if not questions: continue
+        if y_cursor < 100 * mm:
+            c.showPage(); draw_page_header(c, width, height); y_cursor = height - 25*mm
+        component_name_from_db = component_names.get((category, cat_index))
+        title = category if category == 'Allgemein' else f'{category} {cat_index}'
+        if component_name_from_db:
+            title += f" - {component_name_from_db}"
+
+        if category == 'SASIL' and abgang_index == 1:
+            c.setFont("Helvetica-Bold", 14); c.drawString(x_margin, y_cursor, title); y_cursor -= 8*mm
+
+            sasil_counts = project_config.get('sasil_abgaenge_counts', {})
+            num_abgaenge = sasil_counts.get(str(cat_index), 1)
+
+            if num_abgaenge > 1:
+                # Einfache Checkbox ohne Aktion. Der Name ist wichtig für den Import.
+                c.acroForm.checkbox(
+                    name=f'sync_sasil_{cat_index}',
+                    x=x_margin,
+                    y=y_cursor - 4*mm,
+                    tooltip="Wenn angekreuzt, werden die Antworten von Abgang 1 für alle anderen Abgänge dieses Feldes übernommen."
+                )
+
+                c.setFont("Helvetica", 10)
+                c.drawString(x_margin + 10*mm, y_cursor - 1.75*mm, "Alle Messinstrumente sind gleich zu wählen (Wenn diese Aktion ausgewählt ist bitte nur Abgang 1 ausfüllen)")
+                y_cursor -= 10*mm
+
+        if category == 'SASIL':
+            title = f"Abgang {abgang_index}"
+
+        field_suffix = f'_abgang_{abgang_index}' if category == 'SASIL' else ''
+        rows = [layout_row(q) for q in questions]
+        table_h = header_h + sum(row_h for *_, row_h in rows)
+        # Gestempelt wird nur eine Tabelle, die samt Titel auf eine leere Seite passt
+        stamp = template_mode and 10*mm + table_h <= height - 25*mm - 40*mm
+        if stamp and y_cursor - 10*mm - table_h < 40 * mm:
+            c.showPage(); draw_page_header(c, width, height); y_cursor = height - 25*mm
+
+        # ... (Rest der Funktion zum Zeichnen der Tabellen bleibt unverändert) ...
+        c.setFont("Helvetica-Bold", 12); c.drawString(x_margin, y_cursor, title); y_cursor -= 10*mm
+        if stamp:
+            form_name = table_form(rows, table_h)
+            c.saveState(); c.translate(0, y_cursor - table_h); c.doForm(form_name); c.restoreState()
+            y_cursor -= header_h
+            for q, _, _, row_h in rows:
+                add_answer_field(f'question_{q.id}{field_suffix}', row_h, y_cursor)
+                y_cursor -= row_h
+        else:
             y_cursor = draw_table_header(y_cursor)
-            for q in questions:
-                field_name = f'question_{q.id}'
-                if category == 'SASIL':
-                    field_name += f'_abgang_{abgang_index}'
-                display_options = "1. - 63." if "Oberschwingung" in q.question else "SpannungV AC oder DC" if "Spannungsversorgung" in q.question else q.options.replace(',', ', ') + (", Nein" if 'ja' in q.options.lower() and 'nein' not in q.options.lower() else "")
-                q_p, o_p = Paragraph(q.question, style), Paragraph(display_options, style)
-                q_h, o_h = q_p.wrap(col_widths[0] - 4*mm, height)[1], o_p.wrap(col_widths[1] - 4*mm, height)[1]
-                row_h = max(10 * mm, q_h + 4*mm, o_h + 4*mm)
+            for q, q_p, o_p, row_h in rows:
                 if y_cursor - row_h < 40 * mm:
                     c.showPage(); draw_page_header(c, width, height); y_cursor = height - 25*mm
                     y_cursor = draw_table_header(y_cursor)
-                q_p.drawOn(c, x_margin + 2*mm, y_cursor - row_h + 2*mm)
-                o_p.drawOn(c, x_margin + col_widths[0] + 2*mm, y_cursor - row_h + 2*mm)
-                c.acroForm.textfield(name=field_name, x=x_margin + sum(col_widths[:2]) + 2*mm, y=y_cursor - row_h + 2*mm, width=col_widths[2] - 4*mm, height=row_h - 4*mm, borderStyle='solid', borderWidth=1, borderColor=colors.black)
-                c.grid([x_margin, x_margin + col_widths[0], x_margin + sum(col_widths[:2]), x_margin + sum(col_widths)], [y_cursor, y_cursor - row_h])
+                draw_row(q_p, o_p, row_h, y_cursor)
+                add_answer_field(f'question_{q.id}{field_suffix}', row_h, y_cursor)
                 y_cursor -= row_h
-            y_cursor -= 10*mm
+        y_cursor -= 10*mm
 
-        c.save()
-        buffer.seek(0)
-        return send_file(buffer, as_attachment=True, download_name='Fragebogen_ausfuellbar.pdf', mimetype='application/pdf')
+    c.save()
+    return buffer.getvalue()
 
-    except Exception as e:
-        flash(f"Fehler beim Erstellen des PDFs: {e}", "error")
-        import traceback
-        traceback.print_exc()
-        return redirect(url_for('fragen', **session.get('project_config', {})))
 
+# --- Datei-Cache für Fragebögen ---
+QUESTIONNAIRE_CACHE_DIR = os.path.join(basedir, 'pdf_cache')
+QUESTIONNAIRE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+QUESTIONNAIRE_LOGO = os.path.join(basedir, 'static', 'img', 'logo.png')
+QUESTIONNAIRE_LAYOUT_VERSION = 1 # Erhöhen, wenn sich das Layout ändert, damit alte Einträge nicht mehr treffen
+
+class DiskLRUCache:
+    """Inhaltsadressierter Datei-Cache (Schlüssel = Hash der Eingaben), begrenzt auf max_bytes.
+
+    Treffer setzen die mtime neu; beim Schreiben werden die am längsten nicht genutzten Dateien entfernt.
+    """
+    def __init__(self, directory, max_bytes, suffix='.pdf'):
+        self.directory, self.max_bytes, self.suffix = directory, max_bytes, suffix
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as tmp:
+            tmp.write(data)
+        os.replace(tmp.name, self._path(key))
+        self._evict()
+        return self._path(key)
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(self.suffix):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes: break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+questionnaire_pdf_cache = DiskLRUCache(QUESTIONNAIRE_CACHE_DIR, QUESTIONNAIRE_CACHE_MAX_BYTES)
+
+# --- Hintergrundaufträge ---
+# PDF-Erzeugung und -Import laufen in einem kleinen Thread-Pool statt im Request-Thread. Der Auftrag
+# liegt in der Tabelle 'job', das Ergebnis als Datei in JOBS_DIR.
+JOBS_DIR = os.path.join(basedir, 'jobs')
+JOB_WORKERS = 2
+JOB_RETENTION = timedelta(days=1)
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+
+BATCH_IMPORT_PROCESSES = min(4, os.cpu_count() or 1)
+BATCH_IMPORT_MAX_FILES = 200
+BATCH_IMPORT_MAX_FILE_BYTES = 50 * 1024 * 1024
+
+def run_solutions_pdf_job(job):
+    return build_solutions_pdf(job.project_id, job.params.get('bearbeiter', 'N/A'), job.id)
+
+def run_import_answers_job(job):
+    with open(os.path.join(job_input_dir(job.id), 'answers.pdf'), 'rb') as f:
+        imported, messages = import_answers_from_pdf(job.project_id, f)
+    if not imported:
+        return None, messages
+    # Nach dem Import direkt die Lösungs-PDF erzeugen
+    pdf_output, solution_messages = build_solutions_pdf(job.project_id, job.params.get('bearbeiter', 'N/A'), job.id)
+    return pdf_output, messages + solution_messages
+
+def run_batch_import_job(job):
+    """Sammelimport: liest alle PDFs parallel im Prozess-Pool, schreibt je Datei in einer eigenen Transaktion
+    und erstellt einen gemeinsamen Lösungsbericht für alle betroffenen Projekte."""
+    names = job.params.get('files', [])
+    paths = [os.path.join(job_input_dir(job.id), f'{n:04d}.pdf') for n in range(1, len(names) + 1)]
+    workers = min(len(paths), BATCH_IMPORT_PROCESSES)
+    if workers > 1:
+        # PyPDF2 ist reines Python; erst mehrere Prozesse umgehen den GIL. 'spawn', weil der Server Threads hat.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(read_pdf_answers_file, paths))
+    else:
+        results = [read_pdf_answers_file(path) for path in paths]
+
+    messages, imported_files = [], {} # Projekt-ID -> Dateinamen
+    for name, (parsed, seconds, error) in zip(names, results):
+        if error is not None:
+            messages.append(('error', f"{name}: Fehler beim Einlesen der PDF: {error}"))
+            continue
+        answers, sasil_to_sync, question_ids = parsed
+        if not question_ids:
+            messages.append(('warning', f"{name}: Die PDF enthält keine ausfüllbaren Felder."))
+            continue
+        project_id = project_for_question_ids(question_ids)
+        if project_id is None:
+            messages.append(('error', f"{name}: Die Fragen gehören zu keinem oder zu mehreren Projekten."))
+            continue
+        if project_id in imported_files:
+            messages.append(('warning', f"{name}: Überschreibt die Antworten aus {', '.join(imported_files[project_id])} (gleiches Projekt)."))
+        try:
+            imported, file_messages = apply_pdf_answers(project_id, answers, sasil_to_sync, [('PDF lesen', seconds)])
+            if imported: db.session.commit()
+            else: db.session.rollback()
+        except Exception as e:
+            db.session.rollback()
+            traceback.print_exc()
+            imported, file_messages = False, [('error', f"Fehler beim Speichern: {e}")]
+        messages.extend((category, f"{name}: {text}") for category, text in file_messages)
+        if imported:
+            imported_files.setdefault(project_id, []).append(name)
+    if not imported_files:
+        return None, messages
+
+    from fpdf import FPDF
+    pdf = FPDF(orientation='P', unit='mm', format='A4')
+    create_pdf_cover(pdf, job.params.get('bearbeiter', 'N/A'), "Gefilterte Lösungen (Sammelimport)")
+    found_any_solution = False
+    for project_id, file_names in imported_files.items():
+        project = db.session.get(Project, project_id)
+        project_label = project.name or f"Projekt {project_id}"
+        pdf.add_page()
+        pdf.set_font("Arial", 'B', 16); pdf.cell(0, 10, txt=pdf_text(pdf, project_label), ln=True, align='L')
+        pdf.set_font("Arial", '', 10); pdf.cell(0, 8, txt=pdf_text(pdf, f"Dateien: {', '.join(file_names)}", pdf.w - 20), ln=True, align='L')
+        found, trace = draw_project_solutions(pdf, project_id)
+        found_any_solution |= found
+        store_filter_report(trace, f"Sammelimport: {project_label}", project_id, job.id)
+        messages.append(('info', f"{project_label}: {trace.summary()}"))
+    if not found_any_solution:
+        messages.append(('warning', "Insgesamt wurden keine passenden Lösungen gefunden."))
+        return None, messages
+    return pdf.output(dest='S').encode('latin1'), messages
+
+def run_questions_pdf_job(job):
+    return build_questions_pdf(job.project_id, job.params.get('bearbeiter', 'N/A'), job.params.get('kunde', 'N/A'),
+                               template_mode=job.params.get('template_mode', False))
+
+# Art -> (Funktion, Anzeigename, Dateiname des Ergebnisses, Fehlertext)
+JOB_KINDS = {
+    'solutions_pdf': (run_solutions_pdf_job, 'Lösungs-PDF', 'Gefilterte_Loesungen.pdf', 'Ein Fehler ist beim Erstellen des Lösungs-PDFs aufgetreten'),
+    'import_answers': (run_import_answers_job, 'PDF-Import', 'Gefilterte_Loesungen.pdf', 'Fehler beim Einlesen der PDF'),
+    'import_answers_batch': (run_batch_import_job, 'Sammelimport', 'Gefilterte_Loesungen_Sammelimport.pdf', 'Fehler beim Sammelimport'),
+    'questions_pdf': (run_questions_pdf_job, 'Fragebogen', 'Fragebogen_ausfuellbar.pdf', 'Fehler beim Erstellen des PDFs'),
+}
 
-def generate_category_chart(entries):
-    img_dir = os.path.join(basedir, 'static', 'img')
-    os.makedirs(img_dir, exist_ok=True)
-    filepath = os.path.join(img_dir, 'category_chart.png')
+def job_file_path(job_id, suffix):
+    return os.path.join(JOBS_DIR, f'{job_id}_{suffix}.pdf')
+
+def job_input_dir(job_id):
+    return os.path.join(JOBS_DIR, f'{job_id}_input')
+
+def new_job_input_dir():
+    """Legt das Eingabeverzeichnis für einen neuen Auftrag an und liefert (Auftrags-ID, Verzeichnis)."""
+    job_id = uuid.uuid4().hex
+    os.makedirs(job_input_dir(job_id))
+    return job_id, job_input_dir(job_id)
+
+def save_batch_import_files(files, input_dir):
+    """Speichert hochgeladene PDFs und die PDFs aus ZIP-Archiven als 0001.pdf, 0002.pdf, ... und liefert die Originalnamen."""
+    names = []
+    for file in files:
+        filename = file.filename or ''
+        if filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(file.stream) as archive:
+                for info in archive.infolist():
+                    base_name = os.path.basename(info.filename)
+                    if info.is_dir() or not base_name.lower().endswith('.pdf') or base_name.startswith('._'): continue
+                    if info.file_size > BATCH_IMPORT_MAX_FILE_BYTES:
+                        raise ValueError(f"'{base_name}' ist zu groß.")
+                    names.append(base_name)
+                    with archive.open(info) as source, open(os.path.join(input_dir, f'{len(names):04d}.pdf'), 'wb') as target:
+                        shutil.copyfileobj(source, target)
+        elif filename.lower().endswith('.pdf'):
+            names.append(filename)
+            file.save(os.path.join(input_dir, f'{len(names):04d}.pdf'))
+        if len(names) > BATCH_IMPORT_MAX_FILES:
+            raise ValueError(f"Es können höchstens {BATCH_IMPORT_MAX_FILES} Dateien auf einmal importiert werden.")
+    return names
+
+def enqueue_job(kind, params, job_id=None):
+    purge_expired_jobs()
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    job = Job(id=job_id or uuid.uuid4().hex, kind=kind, project_id=current_project_id(), params=params)
+    db.session.add(job)
+    db.session.commit()
+    job_executor.submit(run_job, job.id)
+    return job
+
+def run_job(job_id):
+    """Führt einen Auftrag im Worker-Thread aus; Fehler landen als Meldung am Auftrag."""
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        if job is None: return
+        job.status = 'running'
+        db.session.commit()
+        handler, _, _, error_text = JOB_KINDS[job.kind]
+        try:
+            pdf_output, messages = handler(job)
+        except Exception as e:
+            db.session.rollback()
+            traceback.print_exc()
+            pdf_output, messages = None, [('error', f"{error_text}: {e}")]
+        if pdf_output is not None:
+            with open(job_file_path(job_id, 'result'), 'wb') as f:
+                f.write(pdf_output)
+        job = db.session.get(Job, job_id)
+        job.status = 'finished' if pdf_output is not None else 'failed'
+        job.messages = [list(message) for message in messages]
+        job.finished_at = datetime.now(timezone.utc)
+        db.session.commit()
+        shutil.rmtree(job_input_dir(job_id), ignore_errors=True)
+
+def purge_expired_jobs():
+    """Entfernt abgeschlossene Aufträge samt Dateien nach JOB_RETENTION."""
+    cutoff = datetime.now(timezone.utc) - JOB_RETENTION
+    expired = Job.query.filter(Job.finished_at.isnot(None), Job.finished_at < cutoff.replace(tzinfo=None)).all()
+    if expired:
+        FilterReport.query.filter(FilterReport.job_id.in_([job.id for job in expired])).delete(synchronize_session=False)
+    for job in expired:
+        shutil.rmtree(job_input_dir(job.id), ignore_errors=True)
+        if os.path.exists(job_file_path(job.id, 'result')): os.remove(job_file_path(job.id, 'result'))
+        db.session.delete(job)
+    if expired: db.session.commit()
+
+def fail_interrupted_jobs():
+    """Aufträge, die bei einem Neustart noch offen waren, laufen nicht weiter und werden als fehlgeschlagen markiert."""
+    Job.query.filter(Job.status.in_(['queued', 'running'])).update({
+        Job.status: 'failed', Job.finished_at: datetime.now(timezone.utc),
+        Job.messages: [['error', 'Der Auftrag wurde durch einen Neustart der Anwendung abgebrochen.']],
+    }, synchronize_session=False)
+    db.session.commit()
+
+def job_status(job):
+    status = {
+        'id': job.id, 'kind': job.kind, 'label': JOB_KINDS[job.kind][1], 'status': job.status,
+        'created_at': job.created_at.isoformat(), 'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'messages': [{'category': category, 'text': text} for category, text in job.messages],
+        'status_url': url_for('job_status_api', job_id=job.id),
+    }
+    if job.status == 'finished':
+        status['download_url'] = url_for('download_job_result', job_id=job.id)
+    status['reports'] = [{'label': label, 'url': url_for('filter_report', report_id=report_id)}
+                         for report_id, label in db.session.query(FilterReport.id, FilterReport.label).filter_by(job_id=job.id)]
+    return status
+
+def job_enqueued_response(job):
+    if wants_json_response():
+        return jsonify(job_status(job)), 202
+    flash(f"{JOB_KINDS[job.kind][1]} wird im Hintergrund erstellt. Der Download erscheint unter 'Aufträge' im Bereich Export & Auswertung.", 'info')
+    return redirect(url_for('fragen'))
 
-    if not entries:
+@app.route('/api/auftraege/<string:job_id>')
+def job_status_api(job_id):
+    return jsonify(job_status(db.get_or_404(Job, job_id)))
+
+@app.route('/filterprotokoll/<string:report_id>')
+def filter_report(report_id):
+    report = db.get_or_404(FilterReport, report_id)
+    trace = FilterTrace(report.data['components'])
+    if wants_json_response():
+        return jsonify(dict(trace.to_dict(), id=report.id, label=report.label, job_id=report.job_id,
+                            project_id=report.project_id, created_at=report.created_at.isoformat()))
+    return render_template('filterprotokoll.html', report=report, trace=trace)
+
+@app.route('/auftraege/<string:job_id>/download')
+def download_job_result(job_id):
+    job = db.get_or_404(Job, job_id)
+    if job.status != 'finished' or not os.path.exists(job_file_path(job.id, 'result')):
+        abort(404)
+    return send_file(job_file_path(job.id, 'result'), as_attachment=True, download_name=JOB_KINDS[job.kind][2], mimetype='application/pdf')
+
+# --- Auswertungsgrafik ---
+# Die Grafik wird im Speicher gehalten und nur neu gezeichnet, wenn sich die Zeiterfassung ändert.
+_chart_cache = {}
+_chart_cache_lock = threading.Lock()
+
+def time_entry_fingerprint():
+    """Kennzeichnet den Stand der Tabelle time_entry.
+
+    Einträge werden nur angelegt oder gelöscht, und dank AUTOINCREMENT wird keine ID erneut vergeben: jeder neue
+    Eintrag erhöht max(id) dauerhaft, jedes Löschen ohne späteres Anlegen senkt die Anzahl. Anzahl und max(id)
+    bestimmen den Inhalt damit eindeutig.
+    """
+    count, max_id = db.session.query(func.count(TimeEntry.id), func.max(TimeEntry.id)).one()
+    return f"{count}-{max_id or 0}"
+
+def get_category_chart():
+    fingerprint = time_entry_fingerprint()
+    with _chart_cache_lock:
+        if _chart_cache.get('fingerprint') != fingerprint:
+            try:
+                png = render_category_chart(time_totals('category'))
+            except Exception as e:
+                print(f"Fehler beim Erstellen der Grafik: {e}")
+                if not _chart_cache: raise
+            else:
+                _chart_cache.update(fingerprint=fingerprint, png=png, etag=hashlib.sha1(png).hexdigest(),
+                                    last_modified=datetime.now(timezone.utc))
+        return dict(_chart_cache)
+
+def render_category_chart(category_totals):
+    import matplotlib
+    matplotlib.use('Agg') # Muss vor dem Import von pyplot stehen (kein Display auf dem Server)
+    import matplotlib.pyplot as plt
+    buffer = BytesIO()
+    if not category_totals:
         fig, ax = plt.subplots(figsize=(8, 5))
         ax.text(0.5, 0.5, 'Keine Daten für die Auswertung vorhanden.', ha='center', va='center', fontsize=14, color='gray')
         ax.axis('off')
-        plt.savefig(filepath, bbox_inches='tight', transparent=True); plt.close(fig)
-        return
+        plt.savefig(buffer, format='png', bbox_inches='tight', transparent=True); plt.close(fig)
+        return buffer.getvalue()
 
-    try:
-        df = pd.DataFrame([{'category': e.category, 'duration': e.duration.total_seconds() / 3600} for e in entries])
-        category_totals = df.groupby('category')['duration'].sum()
+    categories, hours = zip(*category_totals)
 
-        fig, ax = plt.subplots(figsize=(10, 7))
-        wedges, texts, autotexts = ax.pie(category_totals.values, labels=category_totals.index, autopct='%1.1f%%',
-                                          startangle=90, pctdistance=0.85, explode=[0.05] * len(category_totals))
+    fig, ax = plt.subplots(figsize=(10, 7))
+    try:
+        wedges, texts, autotexts = ax.pie(hours, labels=categories, autopct='%1.1f%%',
+                                          startangle=90, pctdistance=0.85, explode=[0.05] * len(categories))
         plt.setp(autotexts, size=10, weight="bold", color="white"); plt.setp(texts, size=12, color="dimgray")
         ax.set_title('Zeitverteilung nach Kategorien', size=16, color="dimgray"); ax.axis('equal')
         plt.tight_layout()
-        plt.savefig(filepath, transparent=True); plt.close(fig)
-    except Exception as e:
-        print(f"Fehler beim Erstellen der Grafik: {e}")
+        plt.savefig(buffer, format='png', transparent=True)
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+@app.route('/dokumentation/chart.png')
+def category_chart():
+    try:
+        chart = get_category_chart()
+    except Exception:
+        abort(500)
+    return send_file(BytesIO(chart['png']), mimetype='image/png', etag=chart['etag'],
+                     last_modified=chart['last_modified'], max_age=0)
 
 # --- App Start ---
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        upgrade_fragen_schema()
+        upgrade_time_entry_autoincrement()
+        create_missing_indexes()
+        fail_interrupted_jobs()
     app.run(host='0.0.0.0', port=5050, debug=True)
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""Misst die Startzeit von app.py (Kaltstart eines Workers) und welche schweren Bibliotheken dabei geladen werden.
+
+Aufruf aus dem Projektordner:  python benchmarks/import_time.py [--runs 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'fpdf', 'reportlab', 'PyPDF2', 'PIL', 'openpyxl']
+
+PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(elapsed, ','.join(loaded))
+"""
+
+def measure(runs):
+    timings, loaded = [], ''
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', PROBE], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+        elapsed, _, loaded = result.stdout.strip().rpartition('\n')[2].partition(' ')
+        timings.append(float(elapsed))
+    return timings, loaded
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+    timings, loaded = measure(args.runs)
+    print(f"import app: min {min(timings) * 1000:.0f} ms, Median {statistics.median(timings) * 1000:.0f} ms ({args.runs} Läufe)")
+    print(f"Geladene schwere Bibliotheken: {loaded or 'keine'}")
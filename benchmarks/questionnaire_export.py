@@ -0,0 +1,55 @@
+"""Misst den Fragebogen-Export (render_questions_pdf) für ein großes Projekt: 50 SASIL mit je 20 Abgängen.
+
+Die Fragetexte stammen aus den SASIL-Fragen in fragen.db (nur lesend); die Datenbank wird nicht verändert.
+Aufruf aus dem Projektordner:  python benchmarks/questionnaire_export.py [--sasil 50] [--abgaenge 20]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+from types import SimpleNamespace
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import app
+
+def load_sasil_questions():
+    con = sqlite3.connect(f"file:{os.path.join(REPO_DIR, 'fragen.db')}?mode=ro", uri=True)
+    try:
+        rows = con.execute("SELECT DISTINCT question, options FROM question_answer WHERE category = 'SASIL' ORDER BY question").fetchall()
+    finally:
+        con.close()
+    return rows or [(f"Frage {n} zum Messgerät mit etwas längerem Text für den Umbruch", 'Ja,Nein') for n in range(20)]
+
+def build_rows(num_sasil, num_abgaenge):
+    questions = load_sasil_questions()
+    rows, next_id = [], 1
+    for sasil_index in range(1, num_sasil + 1):
+        for abgang_index in range(1, num_abgaenge + 1):
+            for sort_index, (question, options) in enumerate(questions):
+                rows.append(SimpleNamespace(id=next_id, category='SASIL', category_index=sasil_index, sasil_abgang_index=abgang_index,
+                                            sort_index=sort_index, question=question, options=options, answer=None))
+                next_id += 1
+    config = {'num_trafos': 0, 'num_einspeisungen': 0, 'num_abgaenge': 0, 'num_sasil': num_sasil,
+              'sasil_abgaenge_counts': {str(i): num_abgaenge for i in range(1, num_sasil + 1)}}
+    return config, rows
+
+def measure(config, rows, **options):
+    start = time.perf_counter()
+    pdf_output = app.render_questions_pdf(config, rows, {}, 'Benchmark', 'Benchmark', date.today(), **options)
+    return time.perf_counter() - start, len(pdf_output)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sasil', type=int, default=50)
+    parser.add_argument('--abgaenge', type=int, default=20)
+    args = parser.parse_args()
+    config, rows = build_rows(args.sasil, args.abgaenge)
+    print(f"{args.sasil} SASIL x {args.abgaenge} Abgänge = {len(rows)} Zeilen")
+    measure(config, rows[:50]) # Imports und Schriften vorab laden
+    for label, options in [('ohne Layout-Cache', {'memoize_layout': False}), ('mit Layout-Cache', {}), ('Vorlagenmodus', {'template_mode': True})]:
+        seconds, size = measure(config, rows, **options)
+        print(f"{label:<20} {seconds:6.2f} s  {size / 1024 / 1024:6.1f} MB")